@@ -0,0 +1,109 @@
+"""
+Pack the extracted icons into sprite atlases.
+
+Each group of icons (wagon types, cargo types, token types...) is packed into one image, and a
+manifest records where each icon is inside its atlas. Pages can then show hundreds of icons with
+one image request per group.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+import pathlib
+import typing
+
+import PIL.Image
+import structlog
+
+logger = structlog.get_logger(logger_name=__name__)
+
+ATLAS_GROUP = "atlas"
+MANIFEST = "images/atlas.json"
+
+
+@dataclasses.dataclass(frozen=True)
+class Placement:
+    filename: str
+    x: int
+    y: int
+    w: int
+    h: int
+
+
+def pack(
+    sizes: typing.Mapping[str, tuple[int, int]], max_width: int
+) -> tuple[list[Placement], int, int]:
+    """
+    Place rectangles on shelves, tallest first, starting a new shelf when one is full.
+
+    Returns the placements and the width and height of the atlas.
+    """
+    placements = []
+    x, y, shelf, width = 0, 0, 0, 0
+
+    for filename, (w, h) in sorted(sizes.items(), key=lambda item: (-item[1][1], item[0])):
+        if x > 0 and x + w > max_width:
+            x, y, shelf = 0, y + shelf, 0
+
+        placements.append(Placement(filename=filename, x=x, y=y, w=w, h=h))
+        x += w
+        shelf = max(shelf, h)
+        width = max(width, x)
+
+    return placements, width, y + shelf
+
+
+@dataclasses.dataclass(frozen=True)
+class AtlasFactory:
+    directory: pathlib.Path
+    max_width: int = 2048
+
+    def build(self) -> None:
+        """Pack every group of icons under `images/`, and write the manifest."""
+        manifest: dict[str, dict] = {"atlases": {}, "sprites": {}}
+        images = self.directory / "images"
+
+        for group in sorted(path for path in images.iterdir() if path.is_dir()):
+            if group.name != ATLAS_GROUP:
+                self.build_group(group, manifest)
+
+        (self.directory / MANIFEST).write_text(json.dumps(manifest, indent=2, sort_keys=True))
+        logger.info(
+            "Wrote sprite atlases",
+            atlases=len(manifest["atlases"]),
+            sprites=len(manifest["sprites"]),
+        )
+
+    def build_group(self, group: pathlib.Path, manifest: dict[str, dict]) -> None:
+        icons = {
+            path.relative_to(self.directory).as_posix(): PIL.Image.open(path)
+            for path in sorted(group.glob("*.png"))
+        }
+
+        if not icons:
+            return
+
+        sizes = {filename: icon.size for filename, icon in icons.items()}
+        placements, width, height = pack(sizes, max_width=self.max_width)
+
+        atlas = PIL.Image.new("RGBA", (width, height))
+        for placement in placements:
+            atlas.paste(icons[placement.filename], (placement.x, placement.y))
+
+        output_path = self.directory / "images" / ATLAS_GROUP / f"{group.name}.png"
+        output_path.parent.mkdir(exist_ok=True)
+        atlas.save(output_path, optimize=True)
+
+        filename = output_path.relative_to(self.directory).as_posix()
+        logger.debug("Packed sprite atlas", atlas=filename, sprites=len(placements))
+
+        manifest["atlases"][filename] = [width, height]
+        for placement in placements:
+            manifest["sprites"][placement.filename] = [
+                filename,
+                placement.x,
+                placement.y,
+                placement.w,
+                placement.h,
+            ]
@@ -6,6 +6,7 @@ import structlog
 import sqlalchemy
 import sqlalchemy.engine
 
+import mashinky.extract.atlas
 import mashinky.extract.config
 import mashinky.extract.images
 import mashinky.extract.models
@@ -49,3 +50,6 @@ class Factory:
         )
 
         models_factory.build()
+
+        atlas_factory = mashinky.extract.atlas.AtlasFactory(directory=self.images_directory)
+        atlas_factory.build()
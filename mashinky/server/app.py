@@ -1,9 +1,30 @@
+import concurrent.futures
+import functools
+import io
+import json
+import os
+import pathlib
+import time
 import typing
 
-from flask import Flask, render_template, request
+from flask import (
+    Flask,
+    Response,
+    abort,
+    g,
+    jsonify,
+    make_response,
+    render_template,
+    request,
+    send_file,
+    stream_template,
+    url_for,
+)
 from flask_debugtoolbar import DebugToolbarExtension
 from flask_sqlalchemy import SQLAlchemy
 from jinja2 import StrictUndefined
+from markupsafe import Markup
+import sqlalchemy.orm
 from sqlalchemy import asc
 
 from mashinky.models import (
@@ -17,9 +38,38 @@ from mashinky.models import (
     Wagon,
     WagonType,
 )
-from mashinky.paths import sqlalchemy_database_url, static_folder
-from mashinky.server.trains.generate import generate
-from mashinky.server.trains.options import Options, MaximumLength, MaximumWeight
+from mashinky.paths import sqlalchemy_database_path, sqlalchemy_database_url, static_folder
+from mashinky.server.caching import IMMUTABLE, REVALIDATE, etag, fingerprint, release
+from mashinky.server.sprites import Sprites, icon_html
+from mashinky.server.trains.admission import Admission, predict_candidates
+from mashinky.server.trains.cache import LRUCache
+from mashinky.server.trains.catalog import Catalog, CatalogLoader
+from mashinky.server.trains.deadline import Deadline
+from mashinky.server.trains.generate import (
+    Results,
+    generate,
+    generate_selected,
+    generate_unranked,
+)
+from mashinky.server.trains.incremental import SliceCache
+from mashinky.server.trains.jobs import Job, Jobs
+from mashinky.server.trains.offload import Busy, Offload, resolved
+from mashinky.server.trains.options import (
+    MAXIMUM_ENGINES,
+    Evaluation,
+    MaximumLength,
+    MaximumWeight,
+    Objective,
+    Options,
+    Strategy,
+)
+from mashinky.server.trains.pages import Page
+from mashinky.server.trains.profiling import PROFILES
+from mashinky.server.trains.serialise import serialise_summary, serialise_train
+from mashinky.server.trains.store import ResultStore
+from mashinky.server.trains.streaming import Deferred, buffered
+from mashinky.server.trains.timing import Metrics, Timings, timed, trailed
+from mashinky.server.trains.view import RowBuilder, Selection
 
 app = Flask(import_name=__name__, static_folder=static_folder)
 app.jinja_env.undefined = StrictUndefined
@@ -27,48 +77,611 @@ app.config["SECRET_KEY"] = "50e80816-1736-404b-880d-16e35c6c6ef4"
 app.config["SQLALCHEMY_DATABASE_URI"] = sqlalchemy_database_url
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 app.config["DEBUG_TB_INTERCEPT_REDIRECTS"] = False
+app.config["MASHINKY_PROCESSES"] = int(os.environ.get("MASHINKY_PROCESSES", 1))
+app.config["MASHINKY_RESULTS_CACHE_SIZE"] = int(os.environ.get("MASHINKY_RESULTS_CACHE_SIZE", 128))
+app.config["MASHINKY_SLICE_CACHE_SIZE"] = int(os.environ.get("MASHINKY_SLICE_CACHE_SIZE", 16_384))
+app.config["MASHINKY_RESULTS_STORE"] = os.environ.get("MASHINKY_RESULTS_STORE")
+app.config["MASHINKY_PAGE_SIZE"] = int(os.environ.get("MASHINKY_PAGE_SIZE", 100))
+app.config["MASHINKY_SEARCH_WORKERS"] = int(os.environ.get("MASHINKY_SEARCH_WORKERS", 4))
+app.config["MASHINKY_SEARCH_QUEUE"] = int(os.environ.get("MASHINKY_SEARCH_QUEUE", 16))
+# Seconds a search may take before returning the best trains found so far, where 0 is no limit.
+app.config["MASHINKY_SEARCH_BUDGET"] = float(os.environ.get("MASHINKY_SEARCH_BUDGET", 0))
+app.config["MASHINKY_JOB_WORKERS"] = int(os.environ.get("MASHINKY_JOB_WORKERS", 1))
+app.config["MASHINKY_JOB_QUEUE"] = int(os.environ.get("MASHINKY_JOB_QUEUE", 8))
+app.config["MASHINKY_PROFILING"] = os.environ.get("MASHINKY_PROFILING", "") == "1"
+# Thresholds on the predicted number of candidates a search builds, where 0 turns one off.
+app.config["MASHINKY_ADMISSION_SOLVER"] = int(os.environ.get("MASHINKY_ADMISSION_SOLVER", 50_000))
+app.config["MASHINKY_ADMISSION_LIMIT"] = int(os.environ.get("MASHINKY_ADMISSION_LIMIT", 200_000))
+app.config["MASHINKY_ADMISSION_REFUSE"] = int(
+    os.environ.get("MASHINKY_ADMISSION_REFUSE", 2_000_000)
+)
+app.config["MASHINKY_ADMISSION_TOP"] = int(os.environ.get("MASHINKY_ADMISSION_TOP", 100))
+
+if app.config["MASHINKY_PAGE_SIZE"] < 1:
+    raise ValueError(
+        f"MASHINKY_PAGE_SIZE must be at least 1, not {app.config['MASHINKY_PAGE_SIZE']}."
+    )
+
+# The width of one tile of track in the train icons, in pixels.
+TILE_WIDTH = 100
 
 db = SQLAlchemy(app=app, model_class=Base)
 toolbar = DebugToolbarExtension(app=app)
+memo = SliceCache(app.config["MASHINKY_SLICE_CACHE_SIZE"])
+results_cache: LRUCache[tuple, Results] = LRUCache(app.config["MASHINKY_RESULTS_CACHE_SIZE"])
+results_store = (
+    ResultStore(pathlib.Path(app.config["MASHINKY_RESULTS_STORE"]))
+    if app.config["MASHINKY_RESULTS_STORE"]
+    else None
+)
+catalog = CatalogLoader(sqlalchemy_database_path, lambda: sqlalchemy.orm.Session(db.engine))
+timing_metrics = Metrics()
+admission = Admission(
+    solver=app.config["MASHINKY_ADMISSION_SOLVER"] or None,
+    limit=app.config["MASHINKY_ADMISSION_LIMIT"] or None,
+    refuse=app.config["MASHINKY_ADMISSION_REFUSE"] or None,
+    top=app.config["MASHINKY_ADMISSION_TOP"],
+)
+searches = Offload(app.config["MASHINKY_SEARCH_WORKERS"], app.config["MASHINKY_SEARCH_QUEUE"])
+jobs = Jobs(Offload(app.config["MASHINKY_JOB_WORKERS"], app.config["MASHINKY_JOB_QUEUE"]))
+sprites = Sprites(static_folder)
+templates = release(pathlib.Path(app.root_path) / typing.cast(str, app.template_folder))
 
 
 @app.context_processor
 def variables():
     return {
         "undefined": "—",
-        "tile_width": 100,
+        "tile_width": TILE_WIDTH,
         "Epoch": Epoch,
+        "Objective": Objective,
+        "MAXIMUM_ENGINES": MAXIMUM_ENGINES,
     }
 
 
+@app.template_global()
+def url_for_page(number: int) -> str:
+    """The current URL with a different page number."""
+    args = request.args.to_dict(flat=False)
+    args["page"] = number
+    return url_for(request.endpoint, **args)
+
+
+@app.template_global()
+def image(filename: str, alt: str, **kwargs: typing.Any) -> Markup:
+    """Show an extracted icon, drawn from its sprite atlas if it has one."""
+    return icon_html(sprites.get(filename), static_url, filename, alt, **kwargs)
+
+
+def static_url(filename: str) -> str:
+    """Build each static URL once per request, as pages link the same atlas many times."""
+    urls = g.setdefault("static_urls", {})
+    if filename not in urls:
+        urls[filename] = url_for("static", filename=filename)
+    return urls[filename]
+
+
+@app.url_defaults
+def fingerprint_static(endpoint: str, values: dict[str, typing.Any]) -> None:
+    """Link static files with a fingerprint of their contents, so they can be cached forever."""
+    if endpoint == "static" and "v" not in values:
+        version = fingerprint(static_folder, values["filename"])
+        if version is not None:
+            values["v"] = version
+
+
+@app.before_request
+def start_timings() -> None:
+    g.timings = Timings()
+    g.started = time.perf_counter()
+
+
+@app.after_request
+def send_timings(response: Response) -> Response:
+    """
+    Send the time each stage took, and add them to the metrics once the response is sent.
+
+    A streamed response does most of its work after this, so it only has a header if it set one
+    itself, like `trains_response`, and `view` is the time until it was sent. Streamed pages write
+    their own timings at the end with `trailed`.
+    """
+    timings: typing.Optional[Timings] = g.get("timings")
+
+    if timings is None or request.endpoint in (None, "static"):
+        return response
+
+    endpoint, started = request.endpoint, g.started
+
+    def observe() -> None:
+        if response.is_streamed:
+            timings.add("view", time.perf_counter() - started)
+        timing_metrics.observe(endpoint, timings)
+
+    if not response.is_streamed:
+        timings.add("view", time.perf_counter() - started)
+        response.headers["Server-Timing"] = timings.header()
+
+    response.call_on_close(observe)
+    return response
+
+
+@app.after_request
+def cache_static(response: Response) -> Response:
+    if request.endpoint == "static" and "v" in request.args and response.status_code == 200:
+        response.headers["Cache-Control"] = IMMUTABLE
+    return response
+
+
+def conditional(key: typing.Callable[[], typing.Any] = lambda: ()):
+    """
+    Answer with `304 Not Modified` when the client already has the page.
+
+    The ETag is built from the templates, the catalog, the path and `key()`, which should return
+    everything from the query string that changes the page, normalised so that equivalent queries
+    share a tag. If `key()` returns `None` the page can't be reused, and isn't given an ETag.
+    """
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            parts = key()
+
+            if parts is None:
+                return view(*args, **kwargs)
+
+            tag = etag(templates, catalog.get().digest, request.path, parts)
+
+            if request.if_none_match.contains_weak(tag):
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+
+            response.set_etag(tag)
+            response.headers["Cache-Control"] = REVALIDATE
+            return response
+
+        return wrapper
+
+    return decorator
+
+
 @app.route("/")
 def home():
     return render_template("home.html.j2")
 
 
+Ids = tuple[str, ...]
+
+
 @app.route("/trains", endpoint="trains")
+@conditional(
+    lambda: (
+        None
+        if {"profile", "job_id"} & request.args.keys()
+        or request.args.get("job", default=False, type=bool)
+        else search_tag(request.args.get("page", default=1, type=int), streamed=True)
+    )
+)
 def search_trains():
+    """
+    Search for trains, and show one page of them.
+
+    With `job_id`, the page shows the results of that background job instead, waiting for it if it
+    hasn't finished.
+    """
+    options, engine_ids, wagon_ids, cargo_ids = parse_search()
+    number = request.args.get("page", default=1, type=int)
+    size = app.config["MASHINKY_PAGE_SIZE"]
+
+    if "profile" in request.args:
+        return profile_trains(request.args["profile"], options, engine_ids, wagon_ids, cargo_ids)
+
+    if request.args.get("job", default=False, type=bool):
+        return job_trains(options, engine_ids, wagon_ids, cargo_ids)
+
+    # The search starts now and runs while the top of the page is sent, and the template waits
+    # for it when it first needs the results.
+    if "job_id" in request.args:
+        search = find_job(request.args["job_id"]).future
+    else:
+        search = submit_search(options, engine_ids, wagon_ids, cargo_ids)
+    results = Deferred(search.result)
+    page = Deferred(lambda: Page.paginate(results.trains, number=number, size=size))
+    selection = Deferred(lambda: Selection.from_results(results.get()))
+    rows = Deferred(lambda: RowBuilder(results.get(), options, TILE_WIDTH).rows(page.items))
+    ready = Deferred(lambda: resolve(results, page, selection, rows))
+
+    chunks = stream_template(
+        "trains.html.j2",
+        options=options,
+        results=results,
+        page=page,
+        selection=selection,
+        rows=rows,
+        ready=ready,
+    )
+    chunks = trailed(timed(chunks, g.timings, "render"), g.timings)
+    return Response(buffered(chunks, ready), mimetype="text/html")
+
+
+def resolve(*values: Deferred) -> bool:
+    """
+    Find every deferred value a streamed page shows, before the first of them is sent.
+
+    The response has already started by then, so if one fails the template shows `ready.error`
+    in place of the results rather than cutting the page short.
+    """
+    try:
+        for value in values:
+            value.get()
+    except Exception:
+        app.logger.exception("Search failed while streaming %s", request.full_path)
+        raise
+    return True
+
+
+def profile_trains(
+    kind: str, options: Options, engine_ids: Ids, wagon_ids: Ids, cargo_ids: Ids
+) -> Response:
+    """
+    Search and render the trains page on this thread while profiling it, and send the profile.
+
+    The search skips the results cache and admission control, so the profile includes all of
+    `generate`. Profiling has to be enabled with `MASHINKY_PROFILING=1`, as profiles show the
+    server's code and are slow to make.
+    """
+    if not app.config["MASHINKY_PROFILING"]:
+        abort(403, "Profiling is not enabled on this server.")
+    if kind not in PROFILES:
+        abort(400, f"Unknown profile {kind!r}, use one of {', '.join(PROFILES)}.")
+
+    profile, mimetype = PROFILES[kind]
+    snapshot = catalog.get()
+    number = request.args.get("page", default=1, type=int)
+
+    def render() -> str:
+        results = find_results(
+            snapshot,
+            (options, engine_ids, wagon_ids, cargo_ids),
+            processes=app.config["MASHINKY_PROCESSES"],
+            timings=g.timings,
+            submitted=time.perf_counter(),
+        )
+        page = Page.paginate(results.trains, number=number, size=app.config["MASHINKY_PAGE_SIZE"])
+        return render_template(
+            "trains.html.j2",
+            options=options,
+            results=results,
+            page=page,
+            selection=Selection.from_results(results),
+            rows=RowBuilder(results, options, TILE_WIDTH).rows(page.items),
+        )
+
+    _, data = profile(render)
+    return send_file(
+        io.BytesIO(data),
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=f"trains.{kind}",
+    )
+
+
+def job_trains(options: Options, engine_ids: Ids, wagon_ids: Ids, cargo_ids: Ids):
+    """
+    Start the search as a background job, and show a page that waits for it to finish and then
+    shows its results. They come from the job itself, as the same search without a job is limited
+    by admission control, and the results cache might not have the job's results any more.
+    """
+    args = request.args.to_dict(flat=False)
+    args.pop("job")
+    job = submit_job(options, engine_ids, wagon_ids, cargo_ids)
+    url = url_for("trains", **args)
+    results_url = url_for("trains", **args, job_id=job.id)
+    return render_template("job.html.j2", job=job, url=url, results_url=results_url), 202
+
+
+@app.route("/api/trains")
+@conditional(
+    lambda: search_tag(
+        request.args.get("summary", default=False, type=parse_bool),
+        request.args.get("sort", default=True, type=parse_bool),
+        streamed=not request.args.get("sort", default=True, type=parse_bool),
+    )
+)
+def api_trains():
+    """
+    The same search as `/trains`, as one JSON object per line for each train.
+
+    With `sort=false`, and no limit or objectives, trains are sent in the order they are found
+    instead of waiting for the whole search to finish so they can be ranked.
+    """
+    options, engine_ids, wagon_ids, cargo_ids = parse_search()
+    summary = request.args.get("summary", default=False, type=parse_bool)
+    sort = request.args.get("sort", default=True, type=parse_bool)
+
+    if not (sort or summary or options.limit or options.objectives):
+        response = unranked_response(options, engine_ids, wagon_ids, cargo_ids)
+
+        if response is not None:
+            return response
+
+    results = submit_search(options, engine_ids, wagon_ids, cargo_ids).result()
+    return trains_response(results)
+
+
+def unranked_response(
+    options: Options, engine_ids: Ids, wagon_ids: Ids, cargo_ids: Ids
+) -> typing.Optional[Response]:
+    """
+    Stream the trains of a search from a search worker as each engine is searched.
+
+    Cached searches and searches that admission control would limit are answered from the
+    results as usual, so this returns `None` for them. Streamed trains aren't cached.
+    """
+    snapshot = catalog.get()
+    results_cache.check(snapshot.build)
+
+    if cache_key((options, engine_ids, wagon_ids, cargo_ids), admission) in results_cache:
+        return None
+
+    selected = generate_selected(snapshot, options, engine_ids, wagon_ids, cargo_ids)
+    engines, wagons, suggestions = selected.engines, selected.wagons, selected.suggestions
+    decision = admission.decide(options, predict_candidates(engines, wagons, suggestions, options))
+
+    if decision.refused:
+        return make_response(jsonify(error=decision.message), 422)
+    if decision.options.limit is not None:
+        return None
+
+    trains = searches.stream(
+        lambda: generate_unranked(engines, wagons, suggestions, decision.options)
+    )
+    lines = (json.dumps(serialise_train(train)) + "\n" for train in trains)
+    response = Response(lines, mimetype="application/x-ndjson")
+    response.call_on_close(trains.close)
+    return response
+
+
+@app.route("/api/jobs", methods=["POST"])
+def api_submit_job():
+    """Start the same search as `/api/trains` as a background job."""
+    job = submit_job(*parse_search())
+    response = jsonify(
+        id=job.id,
+        status=job.status,
+        progress=url_for("api_job", id=job.id),
+        trains=url_for("api_job_trains", id=job.id),
+    )
+    response.status_code = 202
+    response.headers["Location"] = url_for("api_job", id=job.id)
+    return response
+
+
+@app.route("/api/jobs/<id>")
+def api_job(id: str):
+    """How far a job has got: its status, how many pairs it has explored, and its stages."""
+    return jsonify(find_job(id).progress())
+
+
+@app.route("/api/jobs/<id>/trains")
+def api_job_trains(id: str):
+    """The trains found by a finished job, in the same format as `/api/trains`."""
+    job = find_job(id)
+
+    if job.status == "failed":
+        return jsonify(job.progress()), 500
+    if job.status != "done":
+        return jsonify(job.progress()), 409
+
+    return trains_response(job.future.result())
+
+
+def trains_response(results: Results) -> Response:
+    if results.refused:
+        return make_response(jsonify(error=results.admission), 422)
+
+    if request.args.get("summary", default=False, type=parse_bool):
+        return jsonify(serialise_summary(results))
+
+    lines = (json.dumps(serialise_train(train)) + "\n" for train in results.trains)
+    response = Response(lines, mimetype="application/x-ndjson")
+    # The search has already run, so its timings are known before the trains are streamed.
+    response.headers["Server-Timing"] = g.timings.header()
+    return response
+
+
+def parse_search() -> tuple[Options, Ids, Ids, Ids]:
+    """Parse the options and selected ids from the query string."""
+    maximum_engines = request.args.get("maximum_engines", default=2, type=int)
+    limit = request.args.get("limit", default=None, type=int)
+    objectives = request.args.getlist("objective")
+    valid = [objective.value for objective in Objective]
+
+    if maximum_engines < 1:
+        abort(400, "A train needs at least one engine.")
+    if limit is not None and limit < 1:
+        abort(400, "A search needs to keep at least one train.")
+
+    for objective in objectives:
+        if objective not in valid:
+            abort(400, f"Unknown objective {objective!r}, use one of {', '.join(valid)}.")
 
     options = Options(
         epoch=Epoch(request.args.get("epoch", default=1, type=int)),
         include_depo_upgrade=request.args.get("include_depo_upgrade", default=False, type=bool),
         include_quest_reward=request.args.get("include_quest_reward", default=False, type=bool),
+        maximum_engines=min(maximum_engines, MAXIMUM_ENGINES),
         maximum_length=MaximumLength(request.args.get("maximum_length", default="short", type=str)),
         maximum_weight=MaximumWeight(request.args.get("maximum_weight", default="full", type=str)),
         station_length_short=request.args.get("station_length_short", default=6, type=int),
         station_length_long=request.args.get("station_length_long", default=8, type=int),
+        evaluation=Evaluation(request.args.get("evaluation", default="trains", type=str)),
+        strategy=Strategy(request.args.get("strategy", default="heuristic", type=str)),
+        objectives=tuple(Objective(value) for value in objectives),
+        limit=limit,
+    ).normalise()
+
+    # The ids are only used to filter the catalog, so their order and any duplicates don't matter.
+    engine_ids = tuple(sorted(set(request.args.getlist("engine_id"))))
+    wagon_ids = tuple(sorted(set(request.args.getlist("wagon_id"))))
+    cargo_ids = tuple(sorted(set(request.args.getlist("cargo_type_id"))))
+
+    return options, engine_ids, wagon_ids, cargo_ids
+
+
+def parse_bool(value: str) -> bool:
+    """Parse a flag given in the query string, like `sort=false` or `summary=1`."""
+    return value.lower() not in ("", "0", "false", "no", "off")
+
+
+def search_tag(*extra: typing.Any, streamed: bool = False) -> typing.Optional[tuple]:
+    """
+    The parts of a search page's ETag that come from the query string.
+
+    With a time budget, a search might only find some of the trains, and those results aren't
+    cached. Search pages only get an ETag once complete results are cached, so a partial page is
+    never reused. The same goes for `streamed` pages, which are sent before the search finishes,
+    so a page showing a failed search, or one cut short, isn't reused either.
+    """
+    search = parse_search()
+
+    cached = cache_key(search, admission) in results_cache
+
+    if (streamed or app.config["MASHINKY_SEARCH_BUDGET"]) and not cached:
+        return None
+
+    return (search, *extra)
+
+
+def submit_search(
+    options: Options, engine_ids: Ids, wagon_ids: Ids, cargo_ids: Ids
+) -> concurrent.futures.Future[Results]:
+    """Use cached results, or start a search for trains on one of the search workers."""
+    snapshot = catalog.get()
+    results_cache.check(snapshot.build)
+    key = (options, engine_ids, wagon_ids, cargo_ids)
+    results = results_cache.get(cache_key(key, admission))
+
+    if results is not None:
+        return resolved(results)
+
+    return searches.submit(
+        find_results,
+        snapshot,
+        key,
+        processes=app.config["MASHINKY_PROCESSES"],
+        timings=g.timings,
+        submitted=time.perf_counter(),
+        budget=app.config["MASHINKY_SEARCH_BUDGET"],
+        admission=admission,
+    )
+
+
+def submit_job(options: Options, engine_ids: Ids, wagon_ids: Ids, cargo_ids: Ids) -> Job:
+    """
+    Start a search on one of the job workers.
+
+    Jobs are for searches that are expected to be slow, so they have no time budget and aren't
+    limited by admission control. Their results are cached apart from searches that are.
+    """
+    key = (options, engine_ids, wagon_ids, cargo_ids)
+    timings = Timings()
+    return jobs.submit(
+        key,
+        timings,
+        find_results,
+        catalog.get(),
+        key,
+        processes=app.config["MASHINKY_PROCESSES"],
+        timings=timings,
+        submitted=time.perf_counter(),
+        admission=None,
     )
 
+
+def find_job(id: str) -> Job:
+    job = jobs.get(id)
+
+    if job is None:
+        abort(404, "There is no job with this id, or it finished a while ago.")
+
+    return job
+
+
+def find_results(
+    snapshot: Catalog,
+    key: tuple[Options, Ids, Ids, Ids],
+    processes: int,
+    timings: Timings,
+    submitted: float,
+    budget: float = 0,
+    admission: typing.Optional[Admission] = None,
+) -> Results:
+    """
+    Find trains and cache them. This runs on a search worker, outside the app context.
+
+    The time budget starts when the search is submitted, so time spent waiting for a worker counts.
+    Results that ran out of time aren't cached, so the search is tried again next time.
+    """
+    waited = time.perf_counter() - submitted
+    timings.add("queue", waited)
+    deadline = Deadline.after(budget - waited) if budget else None
+    options, engine_ids, wagon_ids, cargo_ids = key
     results = generate(
+        snapshot,
         options,
-        engine_ids=request.args.getlist("engine_id"),
-        wagon_ids=request.args.getlist("wagon_id"),
-        cargo_ids=request.args.getlist("cargo_type_id"),
+        engine_ids=list(engine_ids),
+        wagon_ids=list(wagon_ids),
+        cargo_ids=list(cargo_ids),
+        processes=processes,
+        memo=memo,
+        store=results_store,
+        timings=timings,
+        admission=admission,
+        deadline=deadline,
+    )
+
+    if not results.partial:
+        results_cache.put(cache_key(key, admission), results)
+
+    return results
+
+
+def cache_key(
+    search: tuple[Options, Ids, Ids, Ids], admission: typing.Optional[Admission]
+) -> tuple:
+    """
+    The key of a search in `results_cache`. Admission control can change which trains a search
+    finds, so searches with and without it, like jobs, are cached apart.
+    """
+    return (*search, admission)
+
+
+@app.errorhandler(Busy)
+def busy(error: Busy):
+    """Ask the client to come back later instead of queueing behind slow searches."""
+    response = make_response(f"Too many searches are running, try again shortly ({error}).", 503)
+    response.headers["Retry-After"] = "5"
+    return response
+
+
+@app.route("/cache")
+def cache():
+    return jsonify(
+        results=results_cache.stats(),
+        slices=memo.stats(),
+        searches=searches.stats(),
     )
-    return render_template("trains.html.j2", options=options, results=results)
+
+
+@app.route("/metrics")
+def metrics():
+    """Histograms of how long each stage of each endpoint took, and how many items it handled."""
+    return jsonify(timing_metrics.stats())
 
 
 @app.route("/wagon_types")
+@conditional()
 def wagon_types():
     results = WagonType.query.order_by(WagonType.id).all()
     return render_template(
@@ -81,6 +694,7 @@ def wagon_types():
 
 
 @app.route("/cargo_types")
+@conditional()
 def cargo_types():
     return render_template(
         "cargo_types.html.j2",
@@ -89,6 +703,7 @@ def cargo_types():
 
 
 @app.route("/token_types")
+@conditional()
 def token_types():
     return render_template(
         "token_types.html.j2",
@@ -97,5 +712,6 @@ def token_types():
 
 
 @app.route("/colors")
+@conditional()
 def colors():
     return render_template("colors.html.j2", colors=Color.query.all())
@@ -0,0 +1,59 @@
+"""
+HTTP caching for pages that only change when the catalog does.
+
+Every page is built from the catalog and the query string, so a page can be identified by the
+catalog's digest, the templates that render it, and the normalised query. Those are hashed into
+an ETag, and a request that already has the page gets an empty `304 Not Modified` response
+without the page being rendered again.
+
+Static files are linked with a fingerprint of their contents in the query string, so browsers and
+proxies can keep them forever. A changed file gets a new URL instead of a stale copy.
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+import os
+import pathlib
+import typing
+
+# Browsers and proxies can keep fingerprinted static files for a year without asking again.
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Pages can be stored, but are checked with the server before they are used.
+REVALIDATE = "public, no-cache"
+
+
+def etag(*parts: typing.Any) -> str:
+    """Hash anything that can be written as JSON into an ETag."""
+    return hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()[:32]
+
+
+def release(folder: pathlib.Path) -> str:
+    """A digest of the templates in `folder`, so a deployment with changed pages gets new ETags."""
+    digest = hashlib.sha256()
+
+    for path in sorted(folder.rglob("*")):
+        if path.is_file():
+            digest.update(path.relative_to(folder).as_posix().encode())
+            digest.update(path.read_bytes())
+
+    return digest.hexdigest()
+
+
+def fingerprint(folder: pathlib.Path, filename: str) -> typing.Optional[str]:
+    """A short digest of a static file's contents, or `None` if the file doesn't exist."""
+    try:
+        stat = os.stat(folder / filename)
+    except OSError:
+        return None
+
+    return fingerprint_file(folder / filename, stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=4096)
+def fingerprint_file(path: pathlib.Path, mtime_ns: int, size: int) -> str:
+    """Files are only read again when they change, which the modification time and size show."""
+    return hashlib.sha256(path.read_bytes()).hexdigest()[:12]
@@ -0,0 +1,112 @@
+"""
+Show extracted icons from the sprite atlases written by `mashinky.extract.atlas`.
+
+An icon in an atlas is drawn as an element with the atlas as its background, scaled and offset so
+only that icon shows. Icons that aren't in an atlas (or a static folder extracted before atlases
+existed) are still shown as plain images.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+import os
+import pathlib
+import threading
+import typing
+
+from markupsafe import Markup
+
+from mashinky.extract.atlas import MANIFEST
+
+
+@dataclasses.dataclass(frozen=True)
+class Sprite:
+    atlas: str
+    atlas_width: int
+    atlas_height: int
+    x: int
+    y: int
+    w: int
+    h: int
+
+    def size(
+        self, width: typing.Optional[float], height: typing.Optional[float]
+    ) -> tuple[float, float]:
+        """The size to show the sprite at, keeping its aspect ratio if only one side is given."""
+        if width is None and height is None:
+            return self.w, self.h
+        if width is None:
+            return self.w * typing.cast(float, height) / self.h, typing.cast(float, height)
+        if height is None:
+            return width, self.h * width / self.w
+        return width, height
+
+    def style(self, url: str, width: float, height: float) -> str:
+        sx, sy = width / self.w, height / self.h
+        return (
+            f"width: {width:g}px; height: {height:g}px; "
+            f"background: url({url}) {-self.x * sx:g}px {-self.y * sy:g}px / "
+            f"{self.atlas_width * sx:g}px {self.atlas_height * sy:g}px no-repeat;"
+        )
+
+
+class Sprites:
+    """Reads the atlas manifest when it is first used, and again whenever it changes."""
+
+    def __init__(self, folder: pathlib.Path) -> None:
+        self.path = folder / MANIFEST
+        self.build: typing.Optional[tuple[int, int]] = None
+        self.sprites: dict[str, Sprite] = {}
+        self.lock = threading.Lock()
+
+    def get(self, filename: str) -> typing.Optional[Sprite]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+
+        build = (stat.st_mtime_ns, stat.st_size)
+
+        with self.lock:
+            if self.build != build:
+                self.sprites = load(self.path)
+                self.build = build
+
+            return self.sprites.get(filename)
+
+
+def load(path: pathlib.Path) -> dict[str, Sprite]:
+    manifest = json.loads(path.read_text())
+    return {
+        filename: Sprite(atlas, *manifest["atlases"][atlas], x, y, w, h)
+        for filename, (atlas, x, y, w, h) in manifest["sprites"].items()
+    }
+
+
+def icon_html(
+    sprite: typing.Optional[Sprite],
+    url: typing.Callable[[str], str],
+    filename: str,
+    alt: str,
+    *,
+    title: typing.Optional[str] = None,
+    width: typing.Optional[float] = None,
+    height: typing.Optional[float] = None,
+    classes: str = "",
+) -> Markup:
+    """An icon drawn from its atlas if it has a sprite, or as an `<img>` if it doesn't."""
+    attrs = Markup(' title="{}"').format(title) if title is not None else Markup()
+
+    if sprite is None:
+        for name, value in (("width", width), ("height", height)):
+            if value is not None:
+                attrs += Markup(' {}="{:g}px"').format(name, value)
+        if classes:
+            attrs = Markup(' class="{}"').format(classes) + attrs
+        return Markup('<img src="{}" alt="{}"{}>').format(url(filename), alt, attrs)
+
+    style = sprite.style(url(sprite.atlas), *sprite.size(width, height))
+    return Markup('<span class="{}" role="img" aria-label="{}" style="{}"{}></span>').format(
+        " ".join(filter(None, ("app-sprite", classes))), alt, style, attrs
+    )
@@ -0,0 +1,86 @@
+"""
+Decide how much work a search may do before doing it.
+
+The most candidates `generate_trains` builds is known before it starts: for each engine and wagon
+there is a head for each number of engines that fits in a station, a tail for each suggestion (and
+none), and three ways of filling the train with wagons. Searches that would build too many
+candidates use the solver instead, then keep only the best trains, and past a hard limit are
+refused.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import typing
+
+from mashinky.models import Engine, Wagon
+from mashinky.server.trains.bounds import maximum_heads
+from mashinky.server.trains.options import Options, Strategy
+
+# `generate_trains` fills each head and tail to the recommended weight and to both station lengths.
+FILLS = 3
+
+
+def predict_candidates(
+    engines: typing.Sequence[Engine],
+    wagons: typing.Sequence[Wagon],
+    suggestions: dict[Wagon, list[list[Wagon]]],
+    options: Options,
+) -> int:
+    """
+    The most candidates `generate_trains` would build for these engines and wagons. It usually
+    builds fewer, as it stops adding engines to a head once they can't carry any more.
+    """
+    heads = sum(maximum_heads(engine, options) for engine in engines)
+    tails = sum(1 + len(suggestions.get(wagon, [])) for wagon in wagons)
+    return heads * tails * FILLS
+
+
+@dataclasses.dataclass(frozen=True)
+class Decision:
+    options: Options
+    message: typing.Optional[str] = None
+    refused: bool = False
+
+
+@dataclasses.dataclass(frozen=True)
+class Admission:
+    """Thresholds on the predicted number of candidates. `None` turns a threshold off."""
+
+    solver: typing.Optional[int] = 50_000
+    limit: typing.Optional[int] = 200_000
+    refuse: typing.Optional[int] = 2_000_000
+    top: int = 100
+
+    def decide(self, options: Options, candidates: int) -> Decision:
+        if self.refuse is not None and candidates > self.refuse:
+            return Decision(
+                options=options,
+                message=(
+                    f"This search would build {candidates:,} trains, more than the limit of "
+                    f"{self.refuse:,}. Select fewer engines or wagons, or fewer engines per train."
+                ),
+                refused=True,
+            )
+
+        changes = []
+
+        if self.solver is not None and candidates > self.solver:
+            if options.strategy != Strategy.SOLVER:
+                options = dataclasses.replace(options, strategy=Strategy.SOLVER)
+                changes.append("used the solver")
+
+        if self.limit is not None and candidates > self.limit:
+            if options.limit is None or options.limit > self.top:
+                options = dataclasses.replace(options, limit=self.top)
+                changes.append(f"kept only the best {self.top} trains")
+
+        if not changes:
+            return Decision(options=options)
+
+        return Decision(
+            options=options,
+            message=(
+                f"This search would build {candidates:,} trains, " f"so it {' and '.join(changes)}."
+            ),
+        )
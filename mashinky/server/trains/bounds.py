@@ -0,0 +1,99 @@
+"""
+Upper bounds on the capacity of a train as more engines are added to it.
+
+Each engine makes a train longer, and lets it pull more weight. With a limit on length, the number
+of wagons that fit goes down with every engine, and with a limit on weight it goes up. The most
+wagons that any number of engines could take is where the two limits cross, and once a train has
+more engines than that only the length limit matters. The bound for a head is the best that head,
+or any head with more of the same engine, could do, so it never goes up as engines are added.
+
+Once the bound is no higher than the capacity of a train with fewer engines and the same wagons,
+every train with more engines would be discarded by `generate_discard_extra`, so the search can
+stop adding wagons to longer heads. A head and tail that no wagons fit on is in another group,
+without the wagon, so it is only discarded once the same head and tail with fewer engines is kept.
+Until then, or until heads no longer fit in a station, searches keep trying longer heads for it.
+"""
+
+from __future__ import annotations
+
+import math
+
+from mashinky.models import Engine, WagonType
+from mashinky.server.trains.models import Train
+from mashinky.server.trains.options import MaximumLength, MaximumWeight, Options
+
+
+def capacity_bound(options: Options, base: Train, engine: Engine, wagon: WagonType) -> float:
+    """
+    The highest capacity of a train inside the limits made of `base` (a head and a tail) and any
+    number of `wagon`, or of the same train with more of `engine` in its head.
+
+    This is `math.inf` if there is no bound, and -1 if no such train can be inside the limits. The
+    same vectors that `Options.maximum_wagons` takes work here too.
+    """
+    if engine.capacity:
+        return math.inf
+
+    # How many wagons fit under each limit, and how many more (or fewer) fit with each engine.
+    by_length = by_weight = None
+
+    if options.maximum_length != MaximumLength.INFINITE:
+        by_length = (
+            (options.station_length - base.length) / wagon.length,
+            engine.length / wagon.length,
+        )
+
+    if options.maximum_weight == MaximumWeight.FULL and wagon.weight_full:
+        by_weight = (
+            (base.recommended_weight - base.weight_full) / wagon.weight_full,
+            (engine.recommended_weight - engine.weight_full) / wagon.weight_full,
+        )
+    elif options.maximum_weight == MaximumWeight.EMPTY and wagon.weight_empty:
+        by_weight = (
+            (base.recommended_weight - base.weight_empty) / wagon.weight_empty,
+            (engine.recommended_weight - engine.weight_empty) / wagon.weight_empty,
+        )
+
+    if by_length is None:
+        if by_weight is None or by_weight[1] > 0:
+            return math.inf
+        count = by_weight[0]
+    elif by_weight is None:
+        count = by_length[0]
+    else:
+        (length, shorter), (weight, heavier) = by_length, by_weight
+
+        if heavier <= 0 or weight >= length:
+            count = min(length, weight)
+        else:
+            # The limits cross between this head and the next ones.
+            count = (length * heavier + weight * shorter) / (heavier + shorter)
+
+    # Rounded before flooring for the same reason as in `Options.maximum_wagons`.
+    count = math.floor(round(count, 6))
+
+    if count < 0:
+        return -1
+
+    return base.capacity + count * wagon.capacity
+
+
+def exhausted(options: Options, base: Train, empty: bool) -> bool:
+    """
+    Whether longer heads than `base` can be skipped, once its bound has been reached.
+
+    This is when a train of only a head and the tail inside the limits was `empty`, when such a
+    train has no capacity and so is discarded anyway, or when `base` is too long for the station.
+    """
+    if empty or base.capacity == 0:
+        return True
+    return options.maximum_length != MaximumLength.INFINITE and base.length > options.station_length
+
+
+def maximum_heads(engine: Engine, options: Options) -> int:
+    """The most heads of this engine a search builds, as longer heads don't fit in a station."""
+    if options.maximum_length == MaximumLength.INFINITE or not engine.length:
+        return options.maximum_engines
+
+    fits = math.floor(round(options.station_length / engine.length, 6))
+    return max(min(options.maximum_engines, fits), 0)
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import collections
+import threading
+import typing
+
+K = typing.TypeVar("K", bound=typing.Hashable)
+V = typing.TypeVar("V")
+
+
+class LRUCache(typing.Generic[K, V]):
+    """
+    A bounded, least recently used cache that can be shared between threads.
+
+    Values computed from the catalog are only valid for the catalog they were computed from, so
+    `check` clears the cache when it is given a different catalog build.
+    """
+
+    def __init__(self, maxsize: int = 4096) -> None:
+        self.maxsize = maxsize
+        self.values: collections.OrderedDict[K, V] = collections.OrderedDict()
+        self.build: typing.Optional[typing.Hashable] = None
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __contains__(self, key: K) -> bool:
+        """Whether the key is cached, without counting a hit or a miss."""
+        return key in self.values
+
+    def get(self, key: K) -> typing.Optional[V]:
+        with self.lock:
+            value = self.values.get(key)
+
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.values.move_to_end(key)
+
+            return value
+
+    def put(self, key: K, value: V) -> None:
+        with self.lock:
+            self.values[key] = value
+            self.values.move_to_end(key)
+
+            while len(self.values) > self.maxsize:
+                self.values.popitem(last=False)
+
+    def check(self, build: typing.Hashable) -> None:
+        """Clear the cache if the catalog has been reloaded since it was last used."""
+        with self.lock:
+            if build != self.build:
+                self.values.clear()
+                self.build = build
+
+    def clear(self) -> None:
+        with self.lock:
+            self.values.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self.values),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
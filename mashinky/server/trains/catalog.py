@@ -0,0 +1,169 @@
+"""
+An in-memory snapshot of the engines, wagons and cargo types used to generate trains.
+
+The database only changes when `mashinky.extract` is run, so the server loads every wagon type
+and cargo type once and answers the searches made by `generate` from memory. The snapshot holds
+detached ORM objects with every relationship the server uses already loaded, so they can be shared
+between requests and rendered without a session.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import os
+import pathlib
+import threading
+import typing
+
+import sqlalchemy.orm
+
+from mashinky.models import CargoType, Engine, Epoch, Wagon, WagonType
+
+W = typing.TypeVar("W", Engine, Wagon)
+
+# The modification time and size of the database file the catalog was loaded from.
+Build = tuple[int, int]
+
+
+@dataclasses.dataclass(frozen=True)
+class Catalog:
+    """
+    Engines, wagons and cargo types, indexed by epoch.
+
+    Searches return the same results, in the same order, as `WagonType.search` and
+    `CargoType.search`.
+    """
+
+    build: Build
+
+    # A hash of the database file, which is the same wherever the same database is deployed.
+    digest: str
+
+    wagon_types: dict[str, WagonType]
+    engines: dict[typing.Optional[Epoch], tuple[Engine, ...]]
+    wagons: dict[typing.Optional[Epoch], tuple[Wagon, ...]]
+    cargo_types: dict[typing.Optional[Epoch], tuple[CargoType, ...]]
+
+    @classmethod
+    def build_from(
+        cls,
+        build: Build,
+        digest: str,
+        wagon_types: typing.Iterable[WagonType],
+        cargo_types: typing.Iterable[CargoType],
+    ) -> Catalog:
+        wagon_types = sorted(wagon_types, key=lambda wagon_type: wagon_type.id)
+        engines = [wagon_type for wagon_type in wagon_types if isinstance(wagon_type, Engine)]
+        wagons = [wagon_type for wagon_type in wagon_types if isinstance(wagon_type, Wagon)]
+        cargo_types = sorted((c for c in cargo_types if c.name is not None), key=lambda c: c.name)
+
+        epochs = [None, *Epoch]
+
+        return cls(
+            build=build,
+            digest=digest,
+            wagon_types={wagon_type.id: wagon_type for wagon_type in wagon_types},
+            engines={e: tuple(w for w in engines if in_epoch(w, e)) for e in epochs},
+            wagons={e: tuple(w for w in wagons if in_epoch(w, e)) for e in epochs},
+            cargo_types={
+                e: tuple(
+                    c for c in cargo_types if e is None or (c.epoch is not None and c.epoch <= e)
+                )
+                for e in epochs
+            },
+        )
+
+    @classmethod
+    def load(cls, session: sqlalchemy.orm.Session, build: Build, digest: str) -> Catalog:
+        """Load every wagon type and cargo type, and everything needed to render them."""
+        wagon_types = session.query(WagonType).all()
+        cargo_types = session.query(CargoType).all()
+
+        # Payments load their token type lazily, which needs a session.
+        for wagon_type in wagon_types:
+            for payment in (*wagon_type.cost, *wagon_type.sell, *wagon_type.fuel):
+                payment.token_type
+
+        return cls.build_from(build, digest, wagon_types, cargo_types)
+
+    def search_engines(self, **kwargs) -> list[Engine]:
+        return search_wagon_types(self.engines, **kwargs)
+
+    def search_wagons(self, **kwargs) -> list[Wagon]:
+        return search_wagon_types(self.wagons, **kwargs)
+
+    def search_cargo_types(
+        self,
+        *,
+        ids: typing.Optional[typing.Collection[str]] = None,
+        epoch: typing.Optional[Epoch] = None,
+    ) -> list[CargoType]:
+        cargo_types = self.cargo_types[epoch]
+
+        if ids is not None:
+            ids = set(ids)
+            cargo_types = (cargo_type for cargo_type in cargo_types if cargo_type.id in ids)
+
+        return list(cargo_types)
+
+
+def in_epoch(wagon_type: WagonType, epoch: typing.Optional[Epoch]) -> bool:
+    """The same condition as `WagonType.search`, where comparisons with NULL are false."""
+    start, end = wagon_type.epoch_start, wagon_type.epoch_end
+
+    if epoch is None or (start is None and end is None):
+        return True
+
+    return start is not None and end is not None and start <= epoch <= end
+
+
+def search_wagon_types(
+    wagon_types: dict[typing.Optional[Epoch], tuple[W, ...]],
+    *,
+    ids: typing.Optional[typing.Collection[str]] = None,
+    epoch: typing.Optional[Epoch] = None,
+    quest_reward: typing.Optional[bool] = None,
+    depo_upgrade: typing.Optional[bool] = None,
+) -> list[W]:
+    results = wagon_types[epoch]
+
+    if ids is not None:
+        ids = set(ids)
+        results = (wagon_type for wagon_type in results if wagon_type.id in ids)
+
+    if quest_reward is False:
+        results = (wagon_type for wagon_type in results if not wagon_type.quest_reward)
+
+    if depo_upgrade is False:
+        results = (wagon_type for wagon_type in results if not wagon_type.depo_upgrade)
+
+    return list(results)
+
+
+class CatalogLoader:
+    """Loads the catalog when it is first used, and again whenever the database file changes."""
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        session: typing.Callable[[], sqlalchemy.orm.Session],
+    ) -> None:
+        self.path = path
+        self.session = session
+        self.catalog: typing.Optional[Catalog] = None
+        self.lock = threading.Lock()
+
+    def get(self) -> Catalog:
+        stat = os.stat(self.path)
+        build = (stat.st_mtime_ns, stat.st_size)
+
+        with self.lock:
+            if self.catalog is None or self.catalog.build != build:
+                # Closing the session detaches the objects without expiring them.
+                digest = hashlib.sha256(self.path.read_bytes()).hexdigest()
+
+                with self.session() as session:
+                    self.catalog = Catalog.load(session, build, digest)
+
+            return self.catalog
@@ -0,0 +1,27 @@
+"""
+A time budget for a search.
+
+A search with a deadline explores the most promising engines and wagons first, and stops when the
+deadline passes. The trains it has found by then are returned, and `expired` records that they
+might not include the best trains.
+"""
+
+from __future__ import annotations
+
+import time
+
+
+class Deadline:
+    def __init__(self, at: float) -> None:
+        self.at = at
+        self.expired = False
+
+    @classmethod
+    def after(cls, seconds: float) -> Deadline:
+        return cls(time.monotonic() + seconds)
+
+    def check(self) -> bool:
+        """Whether the deadline has passed, remembering if it has."""
+        if not self.expired and time.monotonic() >= self.at:
+            self.expired = True
+        return self.expired
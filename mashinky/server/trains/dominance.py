@@ -0,0 +1,104 @@
+"""Pruning rules for trains that use more resources than another train for no better result."""
+
+from __future__ import annotations
+
+import collections
+import itertools
+import typing
+
+T = typing.TypeVar("T")
+
+
+def discard_dominated(
+    items: typing.Sequence[T],
+    group: typing.Callable[[T], typing.Hashable],
+    cost: typing.Callable[[T], typing.Any],
+    value: typing.Callable[[T], typing.Any],
+) -> typing.Iterable[T]:
+    """
+    Discard items that cost more than another item in the same group but have no higher value.
+
+    Each group is sorted by cost and swept once, tracking the best value seen at a lower cost, so
+    this takes O(n log n) time. The remaining items are returned in their original order.
+    """
+    groups: dict[typing.Hashable, list[int]] = collections.defaultdict(list)
+    costs = [cost(item) for item in items]
+    values = [value(item) for item in items]
+
+    for i, item in enumerate(items):
+        groups[group(item)].append(i)
+
+    dominated = set()
+
+    for indexes in groups.values():
+        indexes.sort(key=costs.__getitem__)
+        best = None
+
+        for _, same_cost in itertools.groupby(indexes, key=costs.__getitem__):
+            same_cost = list(same_cost)
+
+            if best is not None:
+                dominated.update(i for i in same_cost if values[i] <= best)
+
+            highest = max(values[i] for i in same_cost)
+            best = highest if best is None else max(best, highest)
+
+    return [item for i, item in enumerate(items) if i not in dominated]
+
+
+def discard_dominated_stream(
+    items: typing.Iterable[T],
+    group: typing.Callable[[T], typing.Hashable],
+    cost: typing.Callable[[T], typing.Any],
+    value: typing.Callable[[T], typing.Any],
+) -> typing.Iterable[T]:
+    """
+    The same as `discard_dominated`, for items that arrive one at a time in any order.
+
+    Items dominated by an item that came before them are dropped as they arrive, so only the items
+    that might be kept are remembered. A cheaper item that comes later can still dominate an item
+    that was remembered, so nothing is returned until every item has been seen.
+    """
+    best: dict[typing.Hashable, dict[typing.Any, typing.Any]] = collections.defaultdict(dict)
+    kept = []
+
+    for item in items:
+        c, v = cost(item), value(item)
+        values = best[group(item)]
+
+        if any(oc < c and ov >= v for oc, ov in values.items()):
+            continue
+
+        values[c] = max(values.get(c, v), v)
+        kept.append(item)
+
+    # Anything a dropped item would dominate is also dominated by the item that dominated it.
+    yield from discard_dominated(kept, group, cost, value)
+
+
+def pareto_frontier(
+    items: typing.Sequence[T],
+    scores: typing.Callable[[T], tuple],
+) -> typing.Iterable[T]:
+    """
+    Keep only the items that no other item beats on one score without losing on another.
+
+    Scores are tuples where higher is better. This is the sort-filter-skyline algorithm: once the
+    items are sorted by their scores in descending order, an item can only be dominated by one that
+    came before it, so each item is only compared with the frontier found so far. The remaining
+    items are returned in their original order.
+    """
+    keys = [scores(item) for item in items]
+    frontier: list[int] = []
+
+    for i in sorted(range(len(items)), key=keys.__getitem__, reverse=True):
+        if not any(dominates(keys[j], keys[i]) for j in frontier):
+            frontier.append(i)
+
+    kept = set(frontier)
+    return [item for i, item in enumerate(items) if i in kept]
+
+
+def dominates(a: tuple, b: tuple) -> bool:
+    """True if `a` is at least as good as `b` on every score and better on at least one."""
+    return a != b and all(x >= y for x, y in zip(a, b))
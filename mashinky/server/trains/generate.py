@@ -1,17 +1,41 @@
 from __future__ import annotations
 
+import atexit
 import collections
+import concurrent.futures
 import dataclasses
+import functools
+import heapq
 import itertools
 import json
 import logging
 import math
+import operator
 import typing
 
 from mashinky.models import CargoType, Engine, Wagon
+from mashinky.server.trains.admission import Admission, predict_candidates
+from mashinky.server.trains.bounds import capacity_bound, exhausted
+from mashinky.server.trains.dominance import (
+    discard_dominated,
+    discard_dominated_stream,
+    pareto_frontier,
+)
+from mashinky.server.trains.catalog import Catalog
+from mashinky.server.trains.deadline import Deadline
+from mashinky.server.trains.incremental import Slice, SliceCache
 from mashinky.server.trains.suggestions import WAGON_SUGGESTIONS
 from mashinky.server.trains.models import Train
-from mashinky.server.trains.options import Options
+from mashinky.server.trains.options import Evaluation, Options, Strategy
+from mashinky.server.trains.store import ResultStore, Stored
+from mashinky.server.trains.timing import Timings
+from mashinky.server.trains.solver import generate_solved_trains, generate_solved_vectors
+from mashinky.server.trains.vectors import Matrix, Vector, generate_vectors
+
+T = typing.TypeVar("T", Train, Vector)
+
+# Below this many (engine, wagon) pairs, generating in one process is faster than using a pool.
+PARALLEL_THRESHOLD = 64
 
 
 @dataclasses.dataclass(frozen=True)
@@ -32,21 +56,31 @@ class Results:
 
     trains: list[Train]
 
-    after_generate: list[Train]
-    after_deduplicate: list[Train]
-    after_filter: list[Train]
-    after_discard_empty: list[Train]
-    after_discard_extra: list[Train]
-    after_sort: list[Train]
+    # The number of trains left after each stage.
+    after_generate: int
+    after_deduplicate: int
+    after_filter: int
+    after_discard_empty: int
+    after_discard_extra: int
+    after_sort: int
+    after_frontier: int
 
     best_capacity: int
     best_bonus_capacity: int
     best_max_speed: int
-    best_weight_usage: float
-    best_length_usage: float
+    best_weight_usage: typing.Optional[float]
+    best_length_usage: typing.Optional[float]
 
     any_train_has_bonus: bool
 
+    # How many candidates the search was predicted to build, and what was done because of it.
+    predicted: int = 0
+    admission: typing.Optional[str] = None
+    refused: bool = False
+
+    # Whether the search ran out of time, so the trains might not be the best ones.
+    partial: bool = False
+
     def all_engines_are_selected(self):
         return self.all_engines == self.selected_engines
 
@@ -58,41 +92,167 @@ class Results:
 
 
 def generate(
+    catalog: Catalog,
     options: Options,
     engine_ids: list[str],
     wagon_ids: list[str],
     cargo_ids: list[str],
+    processes: int = 1,
+    memo: typing.Optional[SliceCache] = None,
+    store: typing.Optional[ResultStore] = None,
+    timings: typing.Optional[Timings] = None,
+    admission: typing.Optional[Admission] = None,
+    deadline: typing.Optional[Deadline] = None,
 ) -> Results:
-    all_engines = Engine.search(
+    if timings is None:
+        timings = Timings()
+
+    with timings.stage("catalog"):
+        selected = generate_selected(catalog, options, engine_ids, wagon_ids, cargo_ids)
+
+    engines, wagons, suggestions = selected.engines, selected.wagons, selected.suggestions
+
+    predicted = predict_candidates(engines, wagons, suggestions, options)
+    decision = admission.decide(options, predicted) if admission is not None else None
+
+    if decision is not None:
+        options = decision.options
+
+    if decision is not None and decision.refused:
+        stored = Stored(runs=[], counts={})
+    elif store is not None:
+        with timings.stage("store"):
+            # Keyed on the options after admission, as a limited search finds fewer trains.
+            key = store.key(catalog.digest, options, engine_ids, wagon_ids, cargo_ids)
+            stored = store.get(key)
+    else:
+        stored = None
+
+    if stored is not None:
+        trains, counts = stored.trains(catalog.wagon_types), collections.Counter(stored.counts)
+    else:
+        if memo is not None:
+            memo.check(catalog.build)
+
+        trains, counts = generate_ranked(
+            engines, wagons, suggestions, options, processes, memo, timings, deadline
+        )
+
+        # Partial results depend on how busy the server was, so they are never stored.
+        if store is not None and not (deadline is not None and deadline.expired):
+            with timings.stage("store"):
+                store.put(key, Stored.from_trains(trains, counts))
+
+    for stage, count in counts.items():
+        timings.count(stage, count)
+
+    with timings.stage("summary"):
+        weight_usage = (t.weight_usage() for t in trains)
+        length_usage = (t.length_usage(options.station_length) for t in trains)
+
+        best_capacity = max(t.capacity for t in trains) if trains else None
+        best_bonus_capacity = max(t.bonus_capacity for t in trains) if trains else None
+        best_max_speed = max(t.max_speed for t in trains) if trains else None
+        best_weight_usage = max((weight for weight in weight_usage if weight <= 1.00), default=None)
+        best_length_usage = max((length for length in length_usage if length <= 1.00), default=None)
+
+        any_train_has_bonus = any(train.has_bonus for train in trains)
+
+    return Results(
+        options=options,
+        all_engines=selected.all_engines,
+        all_wagons=selected.all_wagons,
+        all_cargos=selected.all_cargos,
+        selected_engines=selected.selected_engines,
+        selected_wagons=selected.selected_wagons,
+        selected_cargos=selected.selected_cargos,
+        filtered_wagons=selected.filtered_wagons,
+        suggestions=suggestions,
+        trains=trains,
+        after_generate=counts["generate"],
+        after_deduplicate=counts["deduplicate"],
+        after_discard_empty=counts["discard_empty"],
+        after_discard_extra=counts["discard_extra"],
+        after_filter=counts["filter"],
+        after_sort=counts["discard_extra"],
+        after_frontier=counts["frontier"],
+        best_capacity=best_capacity,
+        best_bonus_capacity=best_bonus_capacity,
+        best_max_speed=best_max_speed,
+        best_weight_usage=best_weight_usage,
+        best_length_usage=best_length_usage,
+        any_train_has_bonus=any_train_has_bonus,
+        predicted=predicted,
+        admission=decision.message if decision is not None else None,
+        refused=decision.refused if decision is not None else False,
+        partial=deadline is not None and deadline.expired,
+    )
+
+
+@dataclasses.dataclass(frozen=True)
+class Selected:
+    """The engines, wagons and cargo types of the epoch, and the ones selected for a search."""
+
+    all_engines: typing.Sequence[Engine]
+    all_wagons: typing.Sequence[Wagon]
+    all_cargos: typing.Sequence[CargoType]
+
+    selected_engines: typing.Sequence[Engine]
+    selected_wagons: typing.Sequence[Wagon]
+    selected_cargos: typing.Sequence[CargoType]
+
+    filtered_wagons: typing.Sequence[Wagon]
+
+    suggestions: dict[Wagon, list[list[Wagon]]]
+
+    @property
+    def engines(self) -> typing.Sequence[Engine]:
+        """The engines to search, which are all of them if none are selected."""
+        return self.selected_engines or self.all_engines
+
+    @property
+    def wagons(self) -> typing.Sequence[Wagon]:
+        """The wagons to search, which are all of them if none are selected."""
+        return self.filtered_wagons or self.selected_wagons or self.all_wagons
+
+
+def generate_selected(
+    catalog: Catalog,
+    options: Options,
+    engine_ids: typing.Sequence[str],
+    wagon_ids: typing.Sequence[str],
+    cargo_ids: typing.Sequence[str],
+) -> Selected:
+    all_engines = catalog.search_engines(
         epoch=options.epoch,
         depo_upgrade=options.include_depo_upgrade,
         quest_reward=options.include_quest_reward,
-    ).all()
-    all_wagons = Wagon.search(
+    )
+    all_wagons = catalog.search_wagons(
         epoch=options.epoch,
         depo_upgrade=options.include_depo_upgrade,
         quest_reward=options.include_quest_reward,
-    ).all()
-    all_cargos = CargoType.search(
+    )
+    all_cargos = catalog.search_cargo_types(
         epoch=options.epoch,
-    ).all()
+    )
 
-    selected_engines = Engine.search(
+    selected_engines = catalog.search_engines(
         epoch=options.epoch,
         ids=engine_ids,
         depo_upgrade=options.include_depo_upgrade,
         quest_reward=options.include_quest_reward,
-    ).all()
-    selected_wagons = Wagon.search(
+    )
+    selected_wagons = catalog.search_wagons(
         epoch=options.epoch,
         ids=wagon_ids,
         depo_upgrade=options.include_depo_upgrade,
         quest_reward=options.include_quest_reward,
-    ).all()
-    selected_cargos = CargoType.search(
+    )
+    selected_cargos = catalog.search_cargo_types(
         epoch=options.epoch,
         ids=cargo_ids,
-    ).all()
+    )
 
     # Filter wagons to only those that carry the cargos we care about.
     filtered_wagons = generate_wagons(
@@ -105,35 +265,7 @@ def generate(
         selected_wagons=filtered_wagons or selected_wagons or all_wagons,
     )
 
-    trains = after_generate = list(
-        generate_trains(
-            selected_engines=selected_engines or all_engines,
-            selected_wagons=filtered_wagons or selected_wagons or all_wagons,
-            suggestions=suggestions,
-            station_length_short=options.station_length_short,
-            station_length_long=options.station_length_long,
-            maximum_engines=options.maximum_engines,
-        )
-    )
-    trains = after_deduplicate = list(generate_deduplicate(trains))
-    trains = after_filter = list(generate_filter(trains, options))
-    trains = after_discard_empty = list(generate_discard_empty(trains))
-    trains = after_discard_extra = list(generate_discard_extra(trains))
-    trains = after_sort = list(generate_sort(trains))
-
-    weight_usage = (t.weight_usage() for t in trains)
-    length_usage = (t.length_usage(options.station_length) for t in trains)
-
-    best_capacity = max(t.capacity for t in trains) if trains else None
-    best_bonus_capacity = max(t.bonus_capacity for t in trains) if trains else None
-    best_max_speed = max(t.max_speed for t in trains) if trains else None
-    best_weight_usage = max(weight for weight in weight_usage if weight <= 1.00) if trains else None
-    best_length_usage = max(length for length in length_usage if length <= 1.00) if trains else None
-
-    any_train_has_bonus = any(train.has_bonus for train in trains)
-
-    return Results(
-        options=options,
+    return Selected(
         all_engines=all_engines,
         all_wagons=all_wagons,
         all_cargos=all_cargos,
@@ -142,22 +274,104 @@ def generate(
         selected_cargos=selected_cargos,
         filtered_wagons=filtered_wagons,
         suggestions=suggestions,
-        trains=trains,
-        after_generate=after_generate,
-        after_deduplicate=after_deduplicate,
-        after_discard_empty=after_discard_empty,
-        after_discard_extra=after_discard_extra,
-        after_filter=after_filter,
-        after_sort=after_sort,
-        best_capacity=best_capacity,
-        best_bonus_capacity=best_bonus_capacity,
-        best_max_speed=best_max_speed,
-        best_weight_usage=best_weight_usage,
-        best_length_usage=best_length_usage,
-        any_train_has_bonus=any_train_has_bonus,
     )
 
 
+def generate_unranked(
+    engines: typing.Sequence[Engine],
+    wagons: typing.Sequence[Wagon],
+    suggestions: dict[Wagon, list[list[Wagon]]],
+    options: Options,
+) -> typing.Iterable[Train]:
+    """
+    The trains `generate_ranked` finds with no limit and no objectives, in the order they're found.
+
+    Trains with different engines are never duplicates and are never in the same group when
+    discarding extra engines (see `generate_sharded`), so each engine's trains are final as soon
+    as that engine has been searched, and are yielded before the next engine is searched.
+    """
+    for engine in engines:
+        candidates = generate_candidates([engine], wagons, suggestions, options)
+        trains, _ = generate_stages(candidates, options)
+        yield from trains
+
+
+def generate_ranked(
+    engines: typing.Sequence[Engine],
+    wagons: typing.Sequence[Wagon],
+    suggestions: dict[Wagon, list[list[Wagon]]],
+    options: Options,
+    processes: int = 1,
+    memo: typing.Optional[SliceCache] = None,
+    timings: typing.Optional[Timings] = None,
+    deadline: typing.Optional[Deadline] = None,
+) -> tuple[list[Train], collections.Counter[str]]:
+    """
+    Generate, filter and sort trains, and count how many trains were left after each stage.
+
+    With a deadline, pairs are explored one at a time in order of promise so the search can stop
+    early, so it isn't sharded across processes. It still reuses the candidates in `memo`.
+    """
+    if timings is None:
+        timings = Timings()
+
+    # Shards are sent to other processes as vectors, so they always use the vector evaluation.
+    parallel = (
+        deadline is None and processes > 1 and len(engines) * len(wagons) >= PARALLEL_THRESHOLD
+    )
+
+    # The frontier has to see every train, or the best trains on another objective than capacity
+    # could be cut by the limit, so the limit is only applied after it.
+    limit = options.limit
+    if options.objectives:
+        options = dataclasses.replace(options, limit=None)
+
+    # The memo holds trains, so searches that ask for vectors don't use it.
+    if options.evaluation == Evaluation.VECTORS:
+        memo = None
+
+    if parallel or options.evaluation == Evaluation.VECTORS:
+        tail_wagons = (wagon for tails in suggestions.values() for tail in tails for wagon in tail)
+        matrix = Matrix.build(itertools.chain(engines, wagons, tail_wagons))
+    else:
+        matrix = None
+
+    if deadline is not None:
+        with timings.stage("anytime"):
+            trains, counts = generate_anytime(
+                engines, wagons, suggestions, options, deadline, matrix, timings, memo
+            )
+
+            if matrix is not None:
+                trains = [matrix.train(vector) for vector in trains]
+    elif parallel:
+        with timings.stage("sharded"):
+            vectors, counts = generate_sharded(
+                matrix, engines, wagons, suggestions, options, processes
+            )
+            trains = [matrix.train(vector) for vector in vectors]
+    elif memo is not None:
+        trains, counts = generate_incremental(memo, engines, wagons, suggestions, options, timings)
+    else:
+        candidates = generate_candidates(engines, wagons, suggestions, options, matrix)
+        trains, counts = generate_stages(candidates, options, timings)
+
+        if matrix is not None:
+            trains = [matrix.train(vector) for vector in trains]
+
+    with timings.stage("frontier"):
+        trains = list(generate_frontier(trains, options))
+        counts["frontier"] = len(trains)
+
+    with timings.stage("sort"):
+        if limit is None:
+            trains = list(generate_sort(trains))
+        else:
+            trains = list(generate_top(trains, limit))
+
+    return trains, counts
+
+
 def generate_suggestions(
     all_wagons: list[Wagon],
     selected_wagons: list[Wagon],
@@ -181,6 +395,36 @@ def generate_wagons(
     return [w for w in selected_wagons if w.cargo_type in selected_cargos]
 
 
+def generate_candidates(
+    selected_engines: typing.Sequence[Engine],
+    selected_wagons: typing.Sequence[Wagon],
+    suggestions: dict[Wagon, list[list[Wagon]]],
+    options: Options,
+    matrix: typing.Optional[Matrix] = None,
+) -> typing.Iterable[typing.Union[Train, Vector]]:
+    """Generate trains, or vectors if a matrix is given, using the strategy set in the options."""
+    if options.strategy == Strategy.SOLVER:
+        if matrix is not None:
+            return generate_solved_vectors(
+                matrix, selected_engines, selected_wagons, suggestions, options
+            )
+        return generate_solved_trains(selected_engines, selected_wagons, suggestions, options)
+
+    kwargs = dict(
+        selected_engines=selected_engines,
+        selected_wagons=selected_wagons,
+        suggestions=suggestions,
+        station_length_short=options.station_length_short,
+        station_length_long=options.station_length_long,
+        maximum_engines=options.maximum_engines,
+        options=options,
+    )
+
+    if matrix is not None:
+        return generate_vectors(matrix, **kwargs)
+    return generate_trains(**kwargs)
+
+
 def generate_trains(
     selected_engines: typing.Sequence[Engine],
     selected_wagons: typing.Sequence[Wagon],
@@ -188,37 +432,429 @@ def generate_trains(
     station_length_short: int,
     station_length_long: int,
     maximum_engines: int = 2,
+    options: typing.Optional[Options] = None,
 ) -> typing.Iterable[Train]:
-    for engine, wagon in itertools.product(selected_engines, selected_wagons):
-        heads = [engine.times(n) for n in range(1, maximum_engines + 1)]
-        tails = [()] + suggestions.get(wagon, [])
+    """
+    Fill each head and tail to the recommended weight and to both station lengths.
 
-        for head, tail in itertools.product(heads, tails):
-            train = Train((*head, *tail))
-
-            yield train.add_wagons_to_recommended_weight(wagon)
-            yield train.add_wagons_to_length(wagon, station_length_short)
-            yield train.add_wagons_to_length(wagon, station_length_long)
+    If options are given, wagons are no longer added once `capacity_bound` shows that no train with
+    that many engines or more can beat a train inside the limits with fewer engines and the same
+    wagons, and heads stop once `exhausted` says so.
+    """
+    for engine, wagon in itertools.product(selected_engines, selected_wagons):
+        tails = [()] + [tuple((w, 1) for w in tail) for tail in suggestions.get(wagon, [])]
+        best = [0 for _ in tails]
+        bounded = [False for _ in tails]
+        # Whether a train of only the head and tail inside the limits has been generated.
+        empty = [False for _ in tails]
+        done = [False for _ in tails]
+
+        for n in range(1, maximum_engines + 1):
+            for t, tail in enumerate(tails):
+                if done[t]:
+                    continue
+
+                train = Train(((engine, n), *tail))
+
+                if options is not None and not bounded[t]:
+                    bounded[t] = capacity_bound(options, train, engine, wagon) <= best[t]
+
+                # Past the bound, only trains without wagons can be kept (see `bounds`).
+                if bounded[t] and exhausted(options, train, empty[t]):
+                    done[t] = True
+                    continue
+
+                for candidate in generate_fills(
+                    train, wagon, station_length_short, station_length_long
+                ):
+                    if options is not None and candidate == train:
+                        empty[t] = empty[t] or options.should_include(candidate)
+                    elif bounded[t]:
+                        continue
+                    elif options is not None and candidate.capacity > best[t]:
+                        if options.should_include(candidate):
+                            best[t] = candidate.capacity
+
+                    yield candidate
+
+            if all(done):
+                break
+
+
+def generate_fills(
+    train: Train,
+    wagon: Wagon,
+    station_length_short: int,
+    station_length_long: int,
+) -> tuple[Train, Train, Train]:
+    """Fill a head and tail with wagons to the recommended weight and to both station lengths."""
+    return (
+        train.add_wagons_to_recommended_weight(wagon),
+        train.add_wagons_to_length(wagon, station_length_short),
+        train.add_wagons_to_length(wagon, station_length_long),
+    )
 
 
 def generate_discard_extra(trains: list[Train]) -> typing.Iterable[Train]:
     """Remove trains with unused extra engines."""
 
-    similar = collections.defaultdict(list)
+    # Discard trains that have more engines than a similar train but a lower capacity.
+    return discard_dominated(
+        trains,
+        group=operator.attrgetter("wagon_type_set"),
+        cost=operator.attrgetter("engine_count"),
+        value=operator.attrgetter("capacity"),
+    )
 
-    for train in trains:
-        similar[frozenset(train.wagon_types)].append(train)
 
+def generate_stages(
+    candidates: typing.Iterable[T],
+    options: Options,
+    timings: typing.Optional[Timings] = None,
+) -> tuple[list[T], collections.Counter[str]]:
+    """
+    Run the stages that come after generating candidates, except sorting.
+
+    Returns the remaining trains and how many trains were left after each stage. When the options
+    set a limit, this runs the streaming stages and only returns the best trains.
+    """
+    counts = collections.Counter()
+
+    if timings is None:
+        timings = Timings()
+
+    if options.limit is None:
+        with timings.stage("generate"):
+            trains = list(candidates)
+            counts["generate"] = len(trains)
+        with timings.stage("deduplicate"):
+            trains = list(generate_deduplicate(trains))
+            counts["deduplicate"] = len(trains)
+        with timings.stage("filter"):
+            trains = list(generate_filter(trains, options))
+            counts["filter"] = len(trains)
+        with timings.stage("discard_empty"):
+            trains = list(generate_discard_empty(trains))
+            counts["discard_empty"] = len(trains)
+        with timings.stage("discard_extra"):
+            trains = list(generate_discard_extra(trains))
+            counts["discard_extra"] = len(trains)
+        return trains, counts
+
+    with timings.stage("stream"):
+        trains = list(generate_top(generate_stream(candidates, options, counts), options.limit))
+    return trains, counts
+
+
+def generate_anytime(
+    selected_engines: typing.Sequence[Engine],
+    selected_wagons: typing.Sequence[Wagon],
+    suggestions: dict[Wagon, list[list[Wagon]]],
+    options: Options,
+    deadline: Deadline,
+    matrix: typing.Optional[Matrix] = None,
+    timings: typing.Optional[Timings] = None,
+    memo: typing.Optional[SliceCache] = None,
+) -> tuple[list[T], collections.Counter[str]]:
+    """
+    The same trains as `generate_stages`, unless the deadline passes first.
+
+    Engine and wagon pairs are explored in order of `generate_promise`, so the best trains are
+    usually found early. When the deadline passes, no more pairs are started and the trains found
+    so far are returned. At least one pair is always explored. With a `memo`, each pair's
+    candidates come from `generate_memoised` instead of `generate_candidates`.
+    """
+    pairs = sorted(
+        itertools.product(selected_engines, selected_wagons),
+        key=lambda pair: generate_promise(*pair, options),
+        reverse=True,
+    )
+
+    if timings is None:
+        timings = Timings()
+
+    def candidates() -> typing.Iterable[typing.Union[Train, Vector]]:
+        for i, (engine, wagon) in enumerate(pairs):
+            timings.advance(i, len(pairs))
+            timings.count("generate", passed["generate"])
+
+            if i > 0 and deadline.check():
+                return
+
+            if memo is not None:
+                tails = suggestions.get(wagon, [])
+                yield from generate_memoised(memo, engine, wagon, tails, options, timings)
+            else:
+                tails = {wagon: suggestions.get(wagon, [])}
+                yield from generate_candidates([engine], [wagon], tails, options, matrix)
+
+        timings.advance(len(pairs), len(pairs))
+
+    passed = collections.Counter()
+    trains = generate_stream(candidates(), options, passed)
+
+    if options.limit is None:
+        trains = list(trains)
+    else:
+        trains = list(generate_top(trains, options.limit))
+
+    return trains, passed
+
+
+def generate_promise(engine: Engine, wagon: Wagon, options: Options) -> int:
+    """
+    The capacity of the biggest train of only this engine and wagon that fits inside the limits.
+
+    Trains are ranked by capacity, so this is a cheap guess at how good a pair's trains will be.
+    """
+    capacities = [0]
+
+    for n in range(1, options.maximum_engines + 1):
+        count = options.maximum_wagons(Train(((engine, n),)), wagon)
+
+        if count is not None:
+            capacities.append(count * wagon.capacity)
+
+    return max(capacities)
+
+
+def generate_incremental(
+    memo: SliceCache,
+    selected_engines: typing.Sequence[Engine],
+    selected_wagons: typing.Sequence[Wagon],
+    suggestions: dict[Wagon, list[list[Wagon]]],
+    options: Options,
+    timings: typing.Optional[Timings] = None,
+) -> tuple[list[Train], collections.Counter[str]]:
+    """
+    The same trains as `generate_stages`, reusing the candidates of earlier searches in `memo`.
+
+    The candidates for each head and tail are stored before any stage runs, so only the options in
+    `Options.slice_key` decide whether they can be reused. Which heads are tried still depends on
+    the limits (see `capacity_bound`), and every stage runs again on each search.
+    """
+    if timings is None:
+        timings = Timings()
+
+    candidates = []
+    total = len(selected_engines) * len(selected_wagons)
+
+    with timings.stage("generate"):
+        for i, (engine, wagon) in enumerate(itertools.product(selected_engines, selected_wagons)):
+            timings.advance(i, total)
+            tails = suggestions.get(wagon, [])
+            candidates.extend(generate_memoised(memo, engine, wagon, tails, options, timings))
+            timings.count("generate", len(candidates))
+
+    timings.advance(total, total)
+
+    return generate_stages(candidates, options, timings)
+
+
+def generate_memoised(
+    memo: SliceCache,
+    engine: Engine,
+    wagon: Wagon,
+    tails: list[list[Wagon]],
+    options: Options,
+    timings: Timings,
+) -> typing.Iterable[Train]:
+    """The same candidates as `generate_candidates` for one engine and wagon, using `memo`."""
+    tails = [()] + [tuple(tail) for tail in tails]
+    keys = [(engine.id, wagon.id, tuple(w.id for w in tail), options.slice_key()) for tail in tails]
+    best = [0 for _ in tails]
+    bounded = [False for _ in tails]
+    empty = [False for _ in tails]
+    done = [False for _ in tails]
+
+    for n in range(1, options.maximum_engines + 1):
+        for t, tail in enumerate(tails):
+            if done[t]:
+                continue
+
+            train = Train(((engine, n), *((w, 1) for w in tail)))
+
+            if not bounded[t]:
+                bounded[t] = capacity_bound(options, train, engine, wagon) <= best[t]
+
+            # The solver never keeps a train past the bound, with or without wagons.
+            if bounded[t] and (
+                options.strategy == Strategy.SOLVER or exhausted(options, train, empty[t])
+            ):
+                done[t] = True
+                continue
+
+            key = (n, *keys[t])
+            value = memo.get(key)
+
+            if value is None:
+                with timings.stage("slices"):
+                    value = generate_slice(train, wagon, options)
+                memo.put(key, value)
+
+            for candidate in value.trains:
+                # Keep track of the best train for each tail, the same way each strategy does.
+                if options.strategy == Strategy.SOLVER:
+                    if candidate.capacity <= best[t]:
+                        continue
+                    best[t] = candidate.capacity
+                elif candidate == train:
+                    empty[t] = empty[t] or options.should_include(candidate)
+                elif bounded[t]:
+                    continue
+                elif candidate.capacity > best[t]:
+                    if options.should_include(candidate):
+                        best[t] = candidate.capacity
+
+                yield candidate
+
+        if all(done):
+            break
+
+
+def generate_slice(train: Train, wagon: Wagon, options: Options) -> Slice:
+    """The candidates for one head and tail, before any stage has run."""
+    if options.strategy == Strategy.SOLVER:
+        count = options.maximum_wagons(train, wagon)
+        trains = () if count is None else (train.add_wagons(wagon, count),)
+    else:
+        trains = generate_fills(
+            train, wagon, options.station_length_short, options.station_length_long
+        )
+
+    return Slice(trains=tuple(trains))
+
+
+@dataclasses.dataclass(frozen=True)
+class Shard:
+    """A slice of the search that can be pickled and sent to another process."""
+
+    matrix: Matrix
+    engine_ids: tuple[str, ...]
+    wagon_ids: tuple[str, ...]
+    suggestions: dict[str, list[list[str]]]
+    options: Options
+
+
+def generate_sharded(
+    matrix: Matrix,
+    selected_engines: typing.Sequence[Engine],
+    selected_wagons: typing.Sequence[Wagon],
+    suggestions: dict[Wagon, list[list[Wagon]]],
+    options: Options,
+    processes: int,
+) -> tuple[list[Vector], collections.Counter[str]]:
+    """
+    Run `generate_stages` for each engine in a process pool, and merge the results.
+
+    Every train in a shard has the same engine, so no two shards can produce duplicate trains or
+    trains in the same group when discarding extra engines. Merging the shards in engine order
+    gives the same trains, in the same order, as running the stages on everything at once.
+    """
+    compact = matrix.compact()
+    wagon_ids = tuple(wagon.id for wagon in selected_wagons)
+    suggestion_ids = {
+        wagon.id: [[w.id for w in tail] for tail in tails] for wagon, tails in suggestions.items()
+    }
+    shards = [
+        Shard(compact, (engine.id,), wagon_ids, suggestion_ids, options)
+        for engine in selected_engines
+    ]
+
+    trains = []
+    counts = collections.Counter()
+
+    for shard_trains, shard_counts in process_pool(processes).map(generate_shard, shards):
+        trains.extend(shard_trains)
+        counts.update(shard_counts)
+
+    return trains, counts
+
+
+def generate_shard(shard: Shard) -> tuple[list[Vector], collections.Counter[str]]:
+    candidates = generate_candidates(
+        shard.engine_ids, shard.wagon_ids, shard.suggestions, shard.options, shard.matrix
+    )
+    return generate_stages(candidates, shard.options)
+
+
+@functools.lru_cache(maxsize=None)
+def process_pool(processes: int) -> concurrent.futures.ProcessPoolExecutor:
+    """A pool that lives as long as the server, and is shut down when the server exits."""
+    pool = concurrent.futures.ProcessPoolExecutor(max_workers=processes)
+    atexit.register(pool.shutdown, cancel_futures=True)
+    return pool
+
+
+def generate_stream(
+    trains: typing.Iterable[T],
+    options: Options,
+    counts: collections.Counter[str],
+) -> typing.Iterable[T]:
+    """
+    Chain the stages as generators, recording how many trains leave each one in `counts`.
+
+    The trains are the same as `generate_stages`, but they are filtered before they are
+    deduplicated, so only the trains inside the limits are remembered. A train can still be
+    discarded by a cheaper train that comes later, so no train leaves the last stage until every
+    candidate has been seen. Duplicates of trains over the limits aren't found, so they're counted
+    as over the limits instead, and every other count is the same as `generate_stages`.
+    """
+    inside = collections.Counter()
+    trains = generate_count(trains, counts, "generate")
+    trains = generate_count(generate_filter(trains, options), inside, "filter")
+    trains = generate_count(generate_deduplicate_stream(trains), counts, "filter")
+    trains = generate_count(generate_discard_empty(trains), counts, "discard_empty")
+    trains = generate_count(generate_discard_extra_stream(trains), counts, "discard_extra")
+    yield from trains
+    counts["deduplicate"] = counts["generate"] - (inside["filter"] - counts["filter"])
+
+
+def generate_count(
+    trains: typing.Iterable[T],
+    counts: collections.Counter[str],
+    stage: str,
+) -> typing.Iterable[T]:
     for train in trains:
-        others = similar[frozenset(train.wagon_types)]
+        counts[stage] += 1
+        yield train
 
-        # Discard trains that have more engines than a similar train but a lower capacity.
-        if not any(
-            train.engine_count > o.engine_count and train.capacity <= o.capacity for o in others
-        ):
+
+def generate_discard_extra_stream(trains: typing.Iterable[T]) -> typing.Iterable[T]:
+    """The same as `generate_discard_extra`, for trains that arrive one at a time."""
+    return discard_dominated_stream(
+        trains,
+        group=operator.attrgetter("wagon_type_set"),
+        cost=operator.attrgetter("engine_count"),
+        value=operator.attrgetter("capacity"),
+    )
+
+
+def generate_deduplicate_stream(trains: typing.Iterable[T]) -> typing.Iterable[T]:
+    """Deduplicate identical trains."""
+    seen = set()
+    for train in trains:
+        if train not in seen:
+            seen.add(train)
             yield train
 
 
+def generate_top(trains: typing.Iterable[T], limit: int) -> typing.Iterable[T]:
+    """The same as `generate_sort`, but only keeps the first `limit` trains in a bounded heap."""
+    heap: list[tuple[int, int, T]] = []
+
+    # Earlier trains win ties, the same as the stable sort in `generate_sort`.
+    for i, train in enumerate(trains):
+        item = (train.bonus_capacity, -i, train)
+
+        if len(heap) < limit:
+            heapq.heappush(heap, item)
+        elif item[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, item)
+
+    return [train for _, _, train in sorted(heap, key=lambda item: item[:2], reverse=True)]
+
+
 def generate_discard_empty(trains: list[Train]) -> typing.Iterable[Train]:
     """Discard trains with a capacity of zero."""
     for train in trains:
@@ -239,5 +875,16 @@ def generate_filter(trains: list[Train], options) -> typing.Iterable[Train]:
     return filter(options.should_include, trains)
 
 
+def generate_frontier(trains: list[Train], options: Options) -> typing.Iterable[Train]:
+    """Keep only the trains that are the best trade-off between the selected objectives."""
+    if not options.objectives:
+        return trains
+
+    return pareto_frontier(
+        trains,
+        scores=lambda train: tuple(objective.score(train) for objective in options.objectives),
+    )
+
+
 def generate_sort(trains: list[Train]) -> typing.Iterable[Train]:
     return sorted(trains, key=lambda t: t.bonus_capacity, reverse=True)
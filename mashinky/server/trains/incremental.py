@@ -0,0 +1,34 @@
+"""
+Remember the candidates generated for each head and tail between calls to `generate`.
+
+Users usually change one thing at a time, like selecting another wagon, a different cargo or
+another limit, and most of the search is the same as last time. Each slice of the search is the
+candidates for one engine, number of engines, wagon and tail, before any stage has run. It only
+depends on those and the options in `Options.slice_key`, so a slice can be reused by any later
+search with the same inputs, even if its limits are different. Only the slices that are missing are
+generated, and every stage runs on the candidates again.
+
+Slices hold the trains themselves, so a search that reuses one doesn't build them again, which is
+most of the time a search takes. The cache is cleared when the catalog is reloaded, so it never
+keeps trains of an older catalog alive.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import typing
+
+from mashinky.server.trains.cache import LRUCache
+from mashinky.server.trains.models import Train
+
+Key = typing.Hashable
+
+
+@dataclasses.dataclass(frozen=True)
+class Slice:
+    """The candidates generated for one head and tail."""
+
+    trains: tuple[Train, ...]
+
+
+SliceCache = LRUCache[Key, Slice]
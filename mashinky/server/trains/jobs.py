@@ -0,0 +1,105 @@
+"""
+Run expensive searches as background jobs, which clients poll for progress.
+
+A job is a search submitted to its own pool of workers, with the `Timings` that `generate` fills
+in as it runs. The timings show which stages have finished and how many trains they left, and how
+many engine and wagon pairs have been explored so far. Finished jobs are kept for a while so their
+results can be fetched, and searching again while a job for the same search is running returns
+that job instead of starting another.
+"""
+
+from __future__ import annotations
+
+import collections
+import concurrent.futures
+import dataclasses
+import threading
+import time
+import typing
+import uuid
+
+from mashinky.server.trains.offload import Offload
+from mashinky.server.trains.timing import Timings
+
+
+@dataclasses.dataclass(frozen=True)
+class Job:
+    id: str
+    key: typing.Hashable
+    future: concurrent.futures.Future
+    timings: Timings
+    created: float
+
+    @property
+    def status(self) -> str:
+        if self.future.done():
+            return "failed" if self.future.exception() is not None else "done"
+        return "running" if self.future.running() else "queued"
+
+    def progress(self) -> dict[str, typing.Any]:
+        stages = {
+            name: {"seconds": stage.seconds, "items": stage.items}
+            for name, stage in list(self.timings.stages.items())
+        }
+        done, total = self.timings.progress or (0, 0)
+
+        progress: dict[str, typing.Any] = {
+            "id": self.id,
+            "status": self.status,
+            "seconds": time.time() - self.created,
+            "pairs": {"done": done, "total": total},
+            "stages": stages,
+        }
+
+        if self.status == "failed":
+            progress["error"] = str(self.future.exception())
+
+        return progress
+
+
+class Jobs:
+    """The jobs that are running, and the last `keep` jobs that finished."""
+
+    def __init__(self, offload: Offload, keep: int = 64) -> None:
+        self.offload = offload
+        self.keep = keep
+        self.jobs: collections.OrderedDict[str, Job] = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def submit(
+        self,
+        key: typing.Hashable,
+        timings: Timings,
+        fn: typing.Callable[..., typing.Any],
+        /,
+        *args: typing.Any,
+        **kwargs: typing.Any,
+    ) -> Job:
+        """Start a job that runs `fn`, unless a job with the same key is still unfinished."""
+        with self.lock:
+            for job in self.jobs.values():
+                if job.key == key and not job.future.done():
+                    return job
+
+            future = self.offload.submit(fn, *args, **kwargs)
+            job = Job(
+                id=uuid.uuid4().hex,
+                key=key,
+                future=future,
+                timings=timings,
+                created=time.time(),
+            )
+            self.jobs[job.id] = job
+            self.evict()
+            return job
+
+    def get(self, id: str) -> typing.Optional[Job]:
+        with self.lock:
+            return self.jobs.get(id)
+
+    def evict(self) -> None:
+        """Forget the oldest finished jobs beyond `keep`. Unfinished jobs are never forgotten."""
+        finished = [id for id, job in self.jobs.items() if job.future.done()]
+
+        for id in finished[: max(len(finished) - self.keep, 0)]:
+            del self.jobs[id]
@@ -1,39 +1,139 @@
 from __future__ import annotations
 
 import collections
-import dataclasses
 import math
 import typing
 
 from mashinky.models import Amount, CargoType, Engine, Epoch, TokenType, Track, Wagon, WagonType
 
+Runs = tuple[tuple[WagonType, int], ...]
+
 
-@dataclasses.dataclass(frozen=True)
 class Train:
-    wagon_types: tuple[WagonType, ...]
+    """
+    A consist of engines and wagons, stored as runs of (wagon type, count).
+
+    Building, comparing and hashing a train takes time proportional to the number of runs rather
+    than the number of vehicles. Iterating over a train still yields each vehicle in order.
+
+    The totals used while generating and filtering trains are computed once when a train is built.
+    Everything else, like the cargo and costs only needed for rendering, is computed from the runs
+    each time it is used, so a train holds nothing but its runs and totals.
+    """
+
+    __slots__ = (
+        "runs",
+        "engine_count",
+        "weight_empty",
+        "weight_full",
+        "length",
+        "capacity",
+        "power",
+        "max_speed",
+        "recommended_weight",
+        "bonus",
+    )
+
+    runs: Runs
+    engine_count: int
+    weight_empty: int
+    weight_full: int
+    length: float
+    capacity: int
+    power: int
+    max_speed: int
+    recommended_weight: int
+    bonus: int
+
+    def __init__(self, runs: typing.Iterable[tuple[WagonType, int]]) -> None:
+        self.runs = runs = self._normalise(runs)
+
+        engine_count = weight_empty = weight_full = capacity = 0
+        power = recommended_weight = bonus = 0
+        length = 0.0
+        speeds = []
+        bonuses = []
+
+        for wagon_type, count in runs:
+            weight_empty += wagon_type.weight_empty * count
+            weight_full += wagon_type.weight_full * count
+            length += wagon_type.length * count
+            capacity += wagon_type.capacity * count
+
+            if wagon_type.bonus_income:
+                bonuses.append(wagon_type.bonus_income)
+
+            if isinstance(wagon_type, Engine):
+                engine_count += count
+                power += wagon_type.power * count
+                recommended_weight += wagon_type.recommended_weight * count
+                speeds.append(wagon_type.max_speed)
+
+        self.engine_count = engine_count
+        self.weight_empty = weight_empty
+        self.weight_full = weight_full
+        # Lengths are stored to two decimal places, so round away any float error from summing.
+        self.length = round(length, 2)
+        self.capacity = capacity
+        self.power = power
+        self.max_speed = min(speeds) if speeds else 0
+        self.recommended_weight = recommended_weight
+        # No idea if this is max or sum or something else.
+        self.bonus = max(bonuses) if bonuses else 0
+
+    @classmethod
+    def from_wagon_types(cls, wagon_types: typing.Iterable[WagonType]) -> Train:
+        return cls((wagon_type, 1) for wagon_type in wagon_types)
+
+    @staticmethod
+    def _normalise(runs: typing.Iterable[tuple[WagonType, int]]) -> Runs:
+        """Drop empty runs and merge neighbouring runs of the same wagon type."""
+        normalised = []
+
+        for wagon_type, count in runs:
+            if count <= 0:
+                continue
+            if normalised and normalised[-1][0] == wagon_type:
+                count += normalised.pop()[1]
+            normalised.append((wagon_type, count))
+
+        return tuple(normalised)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Train):
+            return NotImplemented
+        return self.runs == other.runs
+
+    def __hash__(self) -> int:
+        return hash(self.runs)
 
     def __iter__(self) -> typing.Iterator[WagonType]:
-        return iter(self.wagon_types)
+        for wagon_type, count in self.runs:
+            for _ in range(count):
+                yield wagon_type
+
+    @property
+    def wagon_types(self) -> tuple[WagonType, ...]:
+        return tuple(self)
 
     @property
     def wagon_type_set(self) -> frozenset[WagonType]:
-        return frozenset(self.wagon_types)
+        return frozenset(wagon_type for wagon_type, _ in self.runs)
 
     @property
     def wagon_type_counter(self) -> collections.Counter[WagonType]:
-        return collections.Counter(self.wagon_types)
+        counter = collections.Counter()
+        for wagon_type, count in self.runs:
+            counter[wagon_type] += count
+        return counter
 
     @property
     def engines(self) -> typing.Generator[Engine]:
-        return (wagon_type for wagon_type in self.wagon_types if isinstance(wagon_type, Engine))
+        return (wagon_type for wagon_type in self if isinstance(wagon_type, Engine))
 
     @property
     def wagons(self) -> typing.Generator[Wagon]:
-        return (wagon_type for wagon_type in self.wagon_types if isinstance(wagon_type, Wagon))
-
-    @property
-    def engine_count(self) -> int:
-        return len(tuple(self.engines))
+        return (wagon_type for wagon_type in self if isinstance(wagon_type, Wagon))
 
     def __repr__(self) -> str:
         return "Train[{}]".format(
@@ -49,110 +149,72 @@ class Train:
 
     @property
     def epoch_start(self) -> typing.Optional[Epoch]:
-        epochs = {
-            wagon_type.epoch_start for wagon_type in self.wagon_types if wagon_type.epoch_start
-        }
+        epochs = {wagon_type.epoch_start for wagon_type, _ in self.runs if wagon_type.epoch_start}
         return max(epochs) if epochs else None
 
     @property
     def epoch_end(self) -> typing.Optional[Epoch]:
-        epochs = {wagon_type.epoch_end for wagon_type in self.wagon_types if wagon_type.epoch_start}
+        epochs = {wagon_type.epoch_end for wagon_type, _ in self.runs if wagon_type.epoch_start}
         return min(epochs) if epochs else None
 
     @property
     def track(self) -> Track:
-        return max(wagon_type.track for wagon_type in self.wagon_types)
-
-    @property
-    def weight_empty(self) -> int:
-        return sum(wagon_type.weight_empty for wagon_type in self.wagon_types)
-
-    @property
-    def weight_full(self) -> int:
-        return sum(wagon_type.weight_full for wagon_type in self.wagon_types)
-
-    @property
-    def length(self) -> float:
-        return sum(wagon_type.length for wagon_type in self.wagon_types)
+        return max(wagon_type.track for wagon_type, _ in self.runs)
 
     @property
     def depo_upgrade(self) -> bool:
-        return any(wagon_type.depo_upgrade for wagon_type in self.wagon_types)
+        return any(wagon_type.depo_upgrade for wagon_type, _ in self.runs)
 
     @property
     def cargo_types(self) -> typing.Sequence[CargoType]:
         # This relies on dict ordering.
-        unique = {w.cargo_type: None for w in self.wagon_types if w.cargo_type is not None}
+        unique = {w.cargo_type: None for w, _ in self.runs if w.cargo_type is not None}
         return list(unique.keys())
 
     @property
-    def cargo(self) -> typing.Counter[WagonType]:
+    def cargo(self) -> dict[CargoType, int]:
         counter = collections.Counter()
 
-        for wagon_type in self.wagon_types:
+        for wagon_type, count in self.runs:
             if wagon_type.cargo_type:
-                counter[wagon_type.cargo_type] += wagon_type.capacity
+                counter[wagon_type.cargo_type] += wagon_type.capacity * count
 
-        return counter
-
-    @property
-    def capacity(self) -> int:
-        return sum(wagon_type.capacity for wagon_type in self.wagon_types)
+        return dict(counter)
 
     @staticmethod
-    def _payments(payments: typing.Iterable[Amount]) -> dict[TokenType, int]:
+    def _payments(payments: typing.Iterable[tuple[Amount, int]]) -> dict[TokenType, int]:
         total = collections.Counter()
 
-        for payment in sorted(payments, key=lambda p: p.token_type.id):
-            total[payment.token_type] += payment.amount
+        for payment, count in sorted(payments, key=lambda p: p[0].token_type.id):
+            total[payment.token_type] += payment.amount * count
 
-        return total
+        return dict(total)
 
     @property
     def cost(self) -> dict[TokenType, int]:
-        return self._payments(payment for wt in self.wagon_types for payment in wt.cost)
+        return self._payments((p, n) for wt, n in self.runs for p in wt.cost)
 
     @property
     def sell(self) -> dict[TokenType, int]:
-        return self._payments(payment for wt in self.wagon_types for payment in wt.sell)
+        return self._payments((p, n) for wt, n in self.runs for p in wt.sell)
 
     @property
     def fuel(self) -> dict[TokenType, int]:
-        return self._payments(payment for wt in self.wagon_types for payment in wt.fuel)
-
-    # Engine properties
-
-    @property
-    def power(self) -> int:
-        return sum(engine.power for engine in self.engines)
-
-    @property
-    def max_speed(self) -> int:
-        return min(engine.max_speed for engine in self.engines)
-
-    @property
-    def recommended_weight(self) -> int:
-        return sum(engine.recommended_weight for engine in self.engines)
+        return self._payments((p, n) for wt, n in self.runs for p in wt.fuel)
 
     # Train properties
 
     @property
     def has_bonus(self) -> bool:
-        return any((wt.bonus_income for wt in self.wagon_types))
+        return self.bonus != 0
 
     @property
     def bonus_incomes(self) -> list[WagonType]:
-        return [wt for wt in self.wagon_types if wt.bonus_income]
+        return [wt for wt in self if wt.bonus_income]
 
     @property
-    def bonus_cargo(self) -> typing.dict[WagonType, int]:
-        counter = collections.Counter()
-
-        # No idea if this is max or sum or something else.
-        bonuses = [wt.bonus_income for wt in self.wagon_types if wt.bonus_income]
-        bonus = max(bonuses) if bonuses else 0
-        multiplier = (bonus + 100) / 100
-
+    def bonus_cargo(self) -> dict[CargoType, int]:
+        multiplier = (self.bonus + 100) / 100
         return {cargo_type: round(multiplier * amount) for cargo_type, amount in self.cargo.items()}
 
     @property
@@ -161,21 +223,21 @@ class Train:
 
     @property
     def estimated_capacity(self) -> int:
-        return sum(self.bonus_cargo[wagon_type] for wagon_type in self.wagon_types)
+        bonus_cargo = self.bonus_cargo
+        return sum(bonus_cargo[wagon_type] for wagon_type in self)
 
-    def add_wagons(self, wagon_types: typing.Sequence[WagonType]):
+    def add_wagons(self, wagon: WagonType, count: int) -> Train:
         """Inserts wagons after the last engine."""
-        index = max(i for i, wt in enumerate(self.wagon_types, 1) if isinstance(wt, Engine))
-        wagon_types = (*self.wagon_types[:index], *wagon_types, *self.wagon_types[index:])
-        return dataclasses.replace(self, wagon_types=wagon_types)
+        index = max(i for i, (wt, _) in enumerate(self.runs, 1) if isinstance(wt, Engine))
+        return Train((*self.runs[:index], (wagon, count), *self.runs[index:]))
 
-    def add_wagons_to_recommended_weight(self: T, wagon: Wagon) -> T:
+    def add_wagons_to_recommended_weight(self, wagon: Wagon) -> Train:
         count = math.floor((self.recommended_weight - self.weight_full) / wagon.weight_full)
-        return self.add_wagons(wagon.times(count))
+        return self.add_wagons(wagon, count)
 
-    def add_wagons_to_length(self: T, wagon: Wagon, length: int) -> T:
+    def add_wagons_to_length(self, wagon: Wagon, length: int) -> Train:
         count = math.floor((length - self.length) / wagon.length)
-        return self.add_wagons(wagon.times(count))
+        return self.add_wagons(wagon, count)
 
     def is_over_recommended_weight_empty(self) -> bool:
         return self.weight_empty > self.recommended_weight
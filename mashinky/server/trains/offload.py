@@ -0,0 +1,134 @@
+"""
+Run searches on a bounded pool of threads, so expensive searches can't use every request worker.
+
+At most `workers` searches run at once, and at most `queue` more wait for a free worker. Searches
+submitted beyond that are refused straight away with `Busy`, instead of waiting behind work that
+will take a long time to finish.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import queue
+import threading
+import typing
+
+T = typing.TypeVar("T")
+
+
+class Busy(Exception):
+    """Raised when every worker is busy and the queue is full."""
+
+
+class Offload:
+    def __init__(self, workers: int, queue: int) -> None:
+        self.workers = workers
+        self.queue = queue
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="search"
+        )
+        self.slots = threading.BoundedSemaphore(workers + queue)
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.refused = 0
+
+    def submit(
+        self, fn: typing.Callable[..., T], /, *args: typing.Any, **kwargs: typing.Any
+    ) -> concurrent.futures.Future[T]:
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.refused += 1
+            raise Busy(f"{self.pending} searches are already running or waiting")
+
+        with self.lock:
+            self.pending += 1
+
+        try:
+            future = self.executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self.release()
+            raise
+
+        future.add_done_callback(lambda _: self.release())
+        return future
+
+    def stream(self, fn: typing.Callable[[], typing.Iterable[T]], buffer: int = 64) -> Stream[T]:
+        """Run a generator on a worker, and read its items on this thread as they're produced."""
+        stream: Stream[T] = Stream(buffer)
+        stream.future = self.submit(stream.produce, fn)
+        return stream
+
+    def release(self) -> None:
+        with self.lock:
+            self.pending -= 1
+        self.slots.release()
+
+    def stats(self) -> dict[str, int]:
+        with self.lock:
+            return {
+                "workers": self.workers,
+                "queue": self.queue,
+                "pending": self.pending,
+                "refused": self.refused,
+            }
+
+
+class Stream(typing.Generic[T]):
+    """
+    The items of a generator running on another thread, in a bounded buffer.
+
+    The generator waits while the buffer is full, so it never gets far ahead of the reader, and
+    stops at the next item once the stream is closed, such as when a client goes away. An error in
+    the generator is raised by the reader once it has read every item before it.
+    """
+
+    DONE = object()
+
+    def __init__(self, buffer: int) -> None:
+        self.items: queue.Queue = queue.Queue(buffer)
+        self.closed = threading.Event()
+        self.future: typing.Optional[concurrent.futures.Future[None]] = None
+
+    def produce(self, fn: typing.Callable[[], typing.Iterable[T]]) -> None:
+        try:
+            for item in fn():
+                if not self.put(item):
+                    return
+        finally:
+            self.put(self.DONE)
+
+    def put(self, item: typing.Any) -> bool:
+        while not self.closed.is_set():
+            try:
+                self.items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def __iter__(self) -> typing.Iterator[T]:
+        return self
+
+    def __next__(self) -> T:
+        if self.closed.is_set():
+            raise StopIteration
+
+        item = self.items.get()
+
+        if item is self.DONE:
+            self.close()
+            # Raise the generator's error, if it had one.
+            typing.cast(concurrent.futures.Future, self.future).result()
+            raise StopIteration
+
+        return item
+
+    def close(self) -> None:
+        self.closed.set()
+
+
+def resolved(value: T) -> concurrent.futures.Future[T]:
+    """A future that already has a value, for results that didn't need a search."""
+    future: concurrent.futures.Future[T] = concurrent.futures.Future()
+    future.set_result(value)
+    return future
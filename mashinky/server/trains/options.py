@@ -2,11 +2,12 @@ from __future__ import annotations
 
 import dataclasses
 import enum
+import math
 import typing
 
 import flask
 
-from mashinky.models import Epoch
+from mashinky.models import Epoch, WagonType
 from mashinky.server.trains.models import Train
 
 
@@ -22,6 +23,56 @@ class MaximumLength(enum.Enum):
     INFINITE = "infinite"
 
 
+class Evaluation(enum.Enum):
+    TRAINS = "trains"
+    VECTORS = "vectors"
+
+
+class Strategy(enum.Enum):
+    HEURISTIC = "heuristic"
+    SOLVER = "solver"
+
+
+class Objective(enum.Enum):
+    BONUS_CAPACITY = "bonus_capacity"
+    MAX_SPEED = "max_speed"
+    COST = "cost"
+    FUEL = "fuel"
+    WEIGHT_USAGE = "weight_usage"
+
+    def __str__(self) -> str:
+        names = {
+            self.BONUS_CAPACITY: "Capacity",
+            self.MAX_SPEED: "Speed",
+            self.COST: "Cost",
+            self.FUEL: "Fuel",
+            self.WEIGHT_USAGE: "Weight usage",
+        }
+
+        return names[self]
+
+    def score(self, train: Train) -> typing.Union[int, float]:
+        """A score for the train where higher is better."""
+        if self == Objective.BONUS_CAPACITY:
+            return train.bonus_capacity
+        elif self == Objective.MAX_SPEED:
+            return train.max_speed
+        elif self == Objective.COST:
+            return -sum(train.cost.values())
+        elif self == Objective.FUEL:
+            return -sum(train.fuel.values())
+        elif self == Objective.WEIGHT_USAGE:
+            # Trains over the recommended weight score below every train that is under it.
+            usage = train.weight_usage()
+            return usage if usage <= 1 else -usage
+        raise NotImplementedError(self)
+
+
+# The most engines a search puts in one train. With no limit on length or weight nothing else stops
+# a search adding engines, and jobs aren't limited by admission control.
+MAXIMUM_ENGINES = 16
+
+
 @dataclasses.dataclass(frozen=True)
 class Options:
     epoch: Epoch
@@ -33,6 +84,10 @@ class Options:
     maximum_length: MaximumLength = MaximumLength.SHORT
     station_length_short: int = 6
     station_length_long: int = 8
+    evaluation: Evaluation = Evaluation.TRAINS
+    strategy: Strategy = Strategy.HEURISTIC
+    objectives: tuple[Objective, ...] = ()
+    limit: typing.Optional[int] = None
 
     @property
     def station_length(self) -> int:
@@ -44,6 +99,25 @@ class Options:
             return self.station_length_long
         raise NotImplementedError(self.maximum_length)
 
+    def normalise(self) -> Options:
+        """An equal copy of the options, where objectives are in a fixed order without duplicates."""
+        objectives = tuple(sorted(set(self.objectives), key=lambda objective: objective.value))
+        return dataclasses.replace(self, objectives=objectives)
+
+    def slice_key(self) -> tuple:
+        """The options that the candidates generated for a single head and tail depend on."""
+        if self.strategy == Strategy.SOLVER:
+            # The solver fills each train up to the limits, so its candidates depend on them.
+            return (
+                self.strategy,
+                self.maximum_weight,
+                self.maximum_length,
+                self.station_length_short,
+                self.station_length_long,
+            )
+
+        return (self.strategy, self.station_length_short, self.station_length_long)
+
     def should_include(self, train: Train) -> bool:
         if self.maximum_weight == MaximumWeight.FULL:
             if train.weight_full > train.recommended_weight:
@@ -61,6 +135,27 @@ class Options:
 
         return True
 
+    def maximum_wagons(self, train: Train, wagon: WagonType) -> typing.Optional[int]:
+        """
+        The most wagons that can be added to a train without going over the limits, or None if the
+        train is already over them. Trains with no limits at all are filled to a long station.
+        """
+        if not self.should_include(train):
+            return None
+
+        counts = []
+
+        if self.maximum_weight == MaximumWeight.FULL and wagon.weight_full:
+            counts.append((train.recommended_weight - train.weight_full) // wagon.weight_full)
+        elif self.maximum_weight == MaximumWeight.EMPTY and wagon.weight_empty:
+            counts.append((train.recommended_weight - train.weight_empty) // wagon.weight_empty)
+
+        if self.maximum_length != MaximumLength.INFINITE or not counts:
+            # Lengths have two decimal places, so round before flooring to avoid losing a wagon.
+            counts.append(math.floor(round((self.station_length - train.length) / wagon.length, 6)))
+
+        return max(min(counts), 0)
+
     def start_again_from_epoch(self) -> str:
         return flask.url_for("trains")
 
@@ -82,6 +177,21 @@ class Options:
         if self.include_quest_reward:
             kwargs["include_quest_reward"] = "true"
 
+        if self.maximum_engines != 2:
+            kwargs["maximum_engines"] = self.maximum_engines
+
+        if self.evaluation != Evaluation.TRAINS:
+            kwargs["evaluation"] = self.evaluation.value
+
+        if self.strategy != Strategy.HEURISTIC:
+            kwargs["strategy"] = self.strategy.value
+
+        if self.objectives:
+            kwargs["objective"] = [objective.value for objective in self.objectives]
+
+        if self.limit is not None:
+            kwargs["limit"] = self.limit
+
         return flask.url_for(
             "trains",
             epoch=epoch.value,
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import dataclasses
+import math
+import typing
+
+T = typing.TypeVar("T")
+
+
+@dataclasses.dataclass(frozen=True)
+class Page(typing.Generic[T]):
+    """One page of a sequence of results, numbered from 1."""
+
+    items: typing.Sequence[T]
+    number: int
+    size: int
+    total: int
+
+    @classmethod
+    def paginate(cls, items: typing.Sequence[T], number: int, size: int) -> Page[T]:
+        """Take a page from the sequence, using the first or last page if `number` is out of range."""
+        pages = max(math.ceil(len(items) / size), 1)
+        number = min(max(number, 1), pages)
+        start = (number - 1) * size
+        return cls(items=items[start : start + size], number=number, size=size, total=len(items))
+
+    @property
+    def pages(self) -> int:
+        return max(math.ceil(self.total / self.size), 1)
+
+    @property
+    def first(self) -> int:
+        """The position of the first item on this page, counting from 1."""
+        return (self.number - 1) * self.size + 1 if self.items else 0
+
+    @property
+    def last(self) -> int:
+        return (self.number - 1) * self.size + len(self.items)
+
+    @property
+    def has_previous(self) -> bool:
+        return self.number > 1
+
+    @property
+    def has_next(self) -> bool:
+        return self.number < self.pages
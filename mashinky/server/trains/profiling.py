@@ -0,0 +1,84 @@
+"""
+Profile one request, and return the profile as a file that can be downloaded.
+
+`pstats` profiles are made with `cProfile`, and can be opened with `python -m pstats` or a viewer
+like snakeviz. `collapsed` profiles are made by sampling the thread's stack, and are in the
+format that flame graph tools (flamegraph.pl, speedscope, inferno) read.
+"""
+
+from __future__ import annotations
+
+import collections
+import cProfile
+import marshal
+import os
+import sys
+import threading
+import types
+import typing
+
+T = typing.TypeVar("T")
+
+
+def profile_pstats(fn: typing.Callable[[], T]) -> tuple[T, bytes]:
+    """Run `fn` with `cProfile`, and return its result and the profile in the pstats format."""
+    profiler = cProfile.Profile()
+    result = profiler.runcall(fn)
+    profiler.create_stats()
+    # This is what `pstats.Stats.dump_stats` writes, without needing a file.
+    return result, marshal.dumps(profiler.stats)  # type: ignore
+
+
+class Sampler(threading.Thread):
+    """Records the stack of another thread every `interval` seconds."""
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: collections.Counter[str] = collections.Counter()
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse(frame)] += 1
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.join()
+
+
+def profile_collapsed(fn: typing.Callable[[], T], interval: float = 0.001) -> tuple[T, bytes]:
+    """Run `fn` while sampling its stack, and return its result and the collapsed stacks."""
+    sampler = Sampler(threading.get_ident(), interval)
+    sampler.start()
+
+    try:
+        result = fn()
+    finally:
+        sampler.stop()
+
+    lines = (f"{stack} {count}\n" for stack, count in sorted(sampler.stacks.items()))
+    return result, "".join(lines).encode()
+
+
+def collapse(frame: typing.Optional[types.FrameType]) -> str:
+    """Format a stack as `outer;...;inner`, with a name for each function and where it is."""
+    names = []
+
+    while frame is not None:
+        code = frame.f_code
+        filename = os.path.basename(code.co_filename)
+        names.append(f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":"))
+        frame = frame.f_back
+
+    return ";".join(reversed(names))
+
+
+# Each kind of profile, and the mimetype of the file it is downloaded as.
+PROFILES = {
+    "pstats": (profile_pstats, "application/octet-stream"),
+    "collapsed": (profile_collapsed, "text/plain"),
+}
@@ -0,0 +1,55 @@
+"""Plain JSON representations of trains and results, for the API."""
+
+from __future__ import annotations
+
+import typing
+
+from mashinky.models import TokenType
+from mashinky.server.trains.generate import Results
+from mashinky.server.trains.models import Train
+
+
+def serialise_train(train: Train) -> dict[str, typing.Any]:
+    return {
+        "runs": [[wagon_type.id, count] for wagon_type, count in train.runs],
+        "engine_count": train.engine_count,
+        "capacity": train.capacity,
+        "bonus": train.bonus,
+        "bonus_capacity": train.bonus_capacity,
+        "cargo": {cargo_type.id: amount for cargo_type, amount in train.bonus_cargo.items()},
+        "max_speed": train.max_speed,
+        "power": train.power,
+        "recommended_weight": train.recommended_weight,
+        "weight_empty": train.weight_empty,
+        "weight_full": train.weight_full,
+        "length": train.length,
+        "cost": serialise_payments(train.cost),
+        "sell": serialise_payments(train.sell),
+        "fuel": serialise_payments(train.fuel),
+    }
+
+
+def serialise_payments(payments: dict[TokenType, int]) -> dict[str, int]:
+    return {token_type.id: amount for token_type, amount in payments.items()}
+
+
+def serialise_summary(results: Results) -> dict[str, typing.Any]:
+    return {
+        "trains": len(results.trains),
+        "after_generate": results.after_generate,
+        "after_deduplicate": results.after_deduplicate,
+        "after_filter": results.after_filter,
+        "after_discard_empty": results.after_discard_empty,
+        "after_discard_extra": results.after_discard_extra,
+        "after_sort": results.after_sort,
+        "after_frontier": results.after_frontier,
+        "best_capacity": results.best_capacity,
+        "best_bonus_capacity": results.best_bonus_capacity,
+        "best_max_speed": results.best_max_speed,
+        "best_weight_usage": results.best_weight_usage,
+        "best_length_usage": results.best_length_usage,
+        "any_train_has_bonus": results.any_train_has_bonus,
+        "predicted": results.predicted,
+        "admission": results.admission,
+        "partial": results.partial,
+    }
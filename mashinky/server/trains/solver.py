@@ -0,0 +1,105 @@
+"""
+Generate trains by solving for the number of wagons instead of trying fixed fills.
+
+Every candidate has the shape `engine x n, wagon x count, *tail`, so for each head and tail the
+only free variable is `count`. Capacity never decreases as wagons are added, so the best train is
+the one with the most wagons that stays inside the limits set by `Options`. That has an exact
+closed form (see `Options.maximum_wagons`), which means trains over the limits are never built.
+
+Adding an engine only helps if it lets the train carry more, so heads are skipped when they don't
+beat the capacity of the same train with fewer engines. Once `capacity_bound` shows that no head
+with more engines can beat it either, no more engines are added.
+"""
+
+from __future__ import annotations
+
+import itertools
+import typing
+
+from mashinky.models import Engine, Wagon
+from mashinky.server.trains.bounds import capacity_bound
+from mashinky.server.trains.models import Train
+from mashinky.server.trains.options import Options
+from mashinky.server.trains.vectors import Matrix, Vector
+
+
+def generate_solved_trains(
+    selected_engines: typing.Sequence[Engine],
+    selected_wagons: typing.Sequence[Wagon],
+    suggestions: dict[Wagon, list[list[Wagon]]],
+    options: Options,
+) -> typing.Iterable[Train]:
+    for engine, wagon in itertools.product(selected_engines, selected_wagons):
+        tails = [()] + [tuple((w, 1) for w in tail) for tail in suggestions.get(wagon, [])]
+        best = [0 for _ in tails]
+        bounded = [False for _ in tails]
+
+        for n in range(1, options.maximum_engines + 1):
+            for t, tail in enumerate(tails):
+                if bounded[t]:
+                    continue
+
+                train = Train(((engine, n), *tail))
+
+                if capacity_bound(options, train, engine, wagon) <= best[t]:
+                    bounded[t] = True
+                    continue
+
+                count = options.maximum_wagons(train, wagon)
+
+                if count is not None:
+                    train = train.add_wagons(wagon, count)
+
+                    if train.capacity > best[t]:
+                        best[t] = train.capacity
+                        yield train
+
+            if all(bounded):
+                break
+
+
+def generate_solved_vectors(
+    matrix: Matrix,
+    selected_engines: typing.Sequence[Engine],
+    selected_wagons: typing.Sequence[Wagon],
+    suggestions: dict[Wagon, list[list[Wagon]]],
+    options: Options,
+) -> typing.Iterable[Vector]:
+    """The same trains as `generate_solved_trains`, built from precomputed heads and tails."""
+    heads = {
+        engine: [
+            matrix.times(matrix.index[engine], n) for n in range(1, options.maximum_engines + 1)
+        ]
+        for engine in selected_engines
+    }
+    tails = {
+        wagon: [Vector.EMPTY] + [matrix.vector(tail) for tail in suggestions.get(wagon, [])]
+        for wagon in selected_wagons
+    }
+
+    for engine, wagon in itertools.product(selected_engines, selected_wagons):
+        i = matrix.index[wagon]
+        single = matrix.times(i, 1)
+        best = [0 for _ in tails[wagon]]
+        bounded = [False for _ in tails[wagon]]
+
+        for head in heads[engine]:
+            for t, tail in enumerate(tails[wagon]):
+                if bounded[t]:
+                    continue
+
+                if capacity_bound(options, head + tail, heads[engine][0], single) <= best[t]:
+                    bounded[t] = True
+                    continue
+
+                count = options.maximum_wagons(head + tail, single)
+
+                if count is not None:
+                    vector = head + matrix.times(i, count) + tail
+
+                    if vector.capacity > best[t]:
+                        best[t] = vector.capacity
+                        yield vector
+
+            if all(bounded):
+                break
@@ -0,0 +1,146 @@
+"""
+Store the trains found by `generate` on disk, so they survive restarts and are shared by workers.
+
+Each entry holds the ids of the wagon types in each train and how many trains were left after
+each stage, which is everything about a search that is expensive to compute. The rest of
+`Results` is rebuilt from the catalog. Entries are keyed on a hash of the catalog's contents, so
+they stay valid when the same database is deployed again and are never used with a different one.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import pathlib
+import time
+import typing
+import zlib
+
+import sqlalchemy
+from sqlalchemy import Column, Float, Integer, LargeBinary, String
+
+from mashinky.models import WagonType
+from mashinky.server.trains.models import Train
+from mashinky.server.trains.options import Options
+
+Runs = list[tuple[str, int]]
+
+metadata = sqlalchemy.MetaData()
+
+results = sqlalchemy.Table(
+    "results",
+    metadata,
+    Column("key", String, primary_key=True),
+    Column("value", LargeBinary, nullable=False),
+    Column("size", Integer, nullable=False),
+    Column("accessed", Float, nullable=False, index=True),
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class Stored:
+    runs: list[Runs]
+    counts: dict[str, int]
+
+    @classmethod
+    def from_trains(
+        cls, trains: typing.Iterable[Train], counts: typing.Mapping[str, int]
+    ) -> Stored:
+        runs = [[(wagon_type.id, count) for wagon_type, count in train.runs] for train in trains]
+        return cls(runs=runs, counts=dict(counts))
+
+    def trains(self, wagon_types: typing.Mapping[str, WagonType]) -> list[Train]:
+        return [Train((wagon_types[id], count) for id, count in runs) for runs in self.runs]
+
+    def encode(self) -> bytes:
+        return zlib.compress(json.dumps({"runs": self.runs, "counts": self.counts}).encode())
+
+    @classmethod
+    def decode(cls, value: bytes) -> Stored:
+        data = json.loads(zlib.decompress(value))
+        runs = [[(id, count) for id, count in runs] for runs in data["runs"]]
+        return cls(runs=runs, counts=data["counts"])
+
+
+class ResultStore:
+    """A SQLite database of stored results, limited to `maxbytes` of compressed entries."""
+
+    def __init__(self, path: pathlib.Path, maxbytes: int = 64 * 1024 * 1024) -> None:
+        self.maxbytes = maxbytes
+        self.engine = sqlalchemy.create_engine(
+            f"sqlite:///{path.absolute()}",
+            future=True,
+            connect_args={"timeout": 30},
+        )
+
+        with self.engine.begin() as connection:
+            # Write-ahead logging lets workers read while another worker is writing.
+            connection.exec_driver_sql("PRAGMA journal_mode=WAL")
+            metadata.create_all(connection)
+
+    @staticmethod
+    def key(
+        digest: str,
+        options: Options,
+        engine_ids: typing.Iterable[str],
+        wagon_ids: typing.Iterable[str],
+        cargo_ids: typing.Iterable[str],
+    ) -> str:
+        options = options.normalise()
+        search = json.dumps(
+            [
+                digest,
+                {f.name: encode(getattr(options, f.name)) for f in dataclasses.fields(options)},
+                sorted(set(engine_ids)),
+                sorted(set(wagon_ids)),
+                sorted(set(cargo_ids)),
+            ]
+        )
+        return hashlib.sha256(search.encode()).hexdigest()
+
+    def get(self, key: str) -> typing.Optional[Stored]:
+        with self.engine.begin() as connection:
+            value = connection.execute(
+                sqlalchemy.select(results.c.value).where(results.c.key == key)
+            ).scalar()
+
+            if value is None:
+                return None
+
+            connection.execute(
+                results.update().where(results.c.key == key).values(accessed=time.time())
+            )
+
+        return Stored.decode(value)
+
+    def put(self, key: str, stored: Stored) -> None:
+        value = stored.encode()
+
+        with self.engine.begin() as connection:
+            connection.execute(results.delete().where(results.c.key == key))
+            connection.execute(
+                results.insert().values(key=key, value=value, size=len(value), accessed=time.time())
+            )
+
+            # Evict the least recently used entries that don't fit inside the limit.
+            connection.execute(
+                sqlalchemy.text("""
+                    DELETE FROM results WHERE key IN (
+                        SELECT key FROM (
+                            SELECT key, SUM(size) OVER (ORDER BY accessed DESC, key) AS total
+                            FROM results
+                        ) WHERE total > :maxbytes
+                    )
+                    """),
+                {"maxbytes": self.maxbytes},
+            )
+
+
+def encode(value: typing.Any) -> typing.Any:
+    """Turn option values into something that can be stored as JSON."""
+    if isinstance(value, tuple):
+        return [encode(v) for v in value]
+    if hasattr(value, "value"):
+        return value.value
+    return value
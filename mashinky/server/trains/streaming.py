@@ -0,0 +1,87 @@
+"""
+Helpers for streaming a rendered page while the results it shows are still being found.
+
+A template rendered with `flask.stream_template` is sent as it is rendered. Passing the results as
+a `Deferred` value means they are only found when the template first uses them, so everything
+above that point (the navigation, the epoch and the options) reaches the browser first.
+"""
+
+from __future__ import annotations
+
+import typing
+
+T = typing.TypeVar("T")
+
+
+class Deferred(typing.Generic[T]):
+    """
+    A value that is computed the first time one of its attributes is used.
+
+    If computing it raises, the exception is kept and raised again each time the value is used.
+    """
+
+    def __init__(self, compute: typing.Callable[[], T]) -> None:
+        self._compute = compute
+        self._value: typing.Optional[T] = None
+        self._error: typing.Optional[Exception] = None
+
+    @property
+    def resolved(self) -> bool:
+        return self._value is not None or self._error is not None
+
+    @property
+    def error(self) -> typing.Optional[Exception]:
+        """Compute the value, and return the exception that raised if it couldn't be."""
+        try:
+            self.get()
+        except Exception as error:
+            return error
+        return None
+
+    def get(self) -> T:
+        if self._error is not None:
+            raise self._error
+        if self._value is None:
+            try:
+                self._value = self._compute()
+            except Exception as error:
+                self._error = error
+                raise
+        return self._value
+
+    def __getattr__(self, name: str) -> typing.Any:
+        return getattr(self.get(), name)
+
+    def __iter__(self) -> typing.Iterator[typing.Any]:
+        return iter(self.get())  # type: ignore
+
+
+def buffered(
+    chunks: typing.Iterable[str],
+    deferred: Deferred,
+    size: int = 16 * 1024,
+) -> typing.Iterator[str]:
+    """
+    Join the many small chunks a template renders into chunks of about `size` characters.
+
+    Chunks are sent as they come until the deferred value is used, so the top of the page is sent
+    before the slow part starts.
+    """
+    buffer = []
+    length = 0
+
+    for chunk in chunks:
+        if not deferred.resolved:
+            yield chunk
+            continue
+
+        buffer.append(chunk)
+        length += len(chunk)
+
+        if length >= size:
+            yield "".join(buffer)
+            buffer = []
+            length = 0
+
+    if buffer:
+        yield "".join(buffer)
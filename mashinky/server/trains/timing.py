@@ -0,0 +1,140 @@
+"""
+Time each stage of a request, and keep histograms of those times across requests.
+
+A request's `Timings` is filled in by `generate` and the views, sent back to the browser in a
+`Server-Timing` header, and then added to `Metrics`. Streamed pages send their headers before the
+search runs, so they end with the timings in a comment instead. The histograms show which stage a
+slow request spent its time in, and how many trains each stage was working with.
+"""
+
+from __future__ import annotations
+
+import bisect
+import contextlib
+import dataclasses
+import threading
+import time
+import typing
+
+# Upper bounds of the histogram buckets, in seconds and in items.
+SECONDS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+ITEMS = (10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+T = typing.TypeVar("T")
+
+
+@dataclasses.dataclass()
+class Stage:
+    # Stages that run inside another stage only have an item count.
+    seconds: typing.Optional[float] = None
+    items: typing.Optional[int] = None
+
+
+class Timings:
+    """The wall time and item count of each stage of one request, in the order they started."""
+
+    def __init__(self) -> None:
+        self.stages: dict[str, Stage] = {}
+        # How many of the engine and wagon pairs have been explored, for reporting progress.
+        self.progress: typing.Optional[tuple[int, int]] = None
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> typing.Iterator[Stage]:
+        start = time.perf_counter()
+        try:
+            yield self.stages.setdefault(name, Stage())
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float) -> None:
+        stage = self.stages.setdefault(name, Stage())
+        stage.seconds = (stage.seconds or 0.0) + seconds
+
+    def count(self, name: str, items: int) -> None:
+        self.stages.setdefault(name, Stage()).items = items
+
+    def advance(self, done: int, total: int) -> None:
+        self.progress = (done, total)
+
+    def header(self) -> str:
+        """Format the timings as a `Server-Timing` header."""
+        metrics = []
+
+        for name, stage in list(self.stages.items()):
+            metric = name
+            if stage.seconds is not None:
+                metric += f";dur={stage.seconds * 1000:.3f}"
+            if stage.items is not None:
+                metric += f';desc="{stage.items} items"'
+            metrics.append(metric)
+
+        return ", ".join(metrics)
+
+    def comment(self) -> str:
+        """Format the timings as an HTML comment, for the end of a streamed page."""
+        return f"\n<!-- Server-Timing: {self.header()} -->\n"
+
+
+class Histogram:
+    def __init__(self, bounds: typing.Sequence[float]) -> None:
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def stats(self) -> dict[str, typing.Any]:
+        """Cumulative bucket counts, keyed by their upper bound."""
+        cumulative = 0
+        buckets = {}
+
+        for bound, count in zip([*self.bounds, "+Inf"], self.buckets):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+
+        return {"count": self.count, "sum": self.sum, "buckets": buckets}
+
+
+class Metrics:
+    """Histograms of each stage's time and item count, for each endpoint."""
+
+    def __init__(self) -> None:
+        self.seconds: dict[tuple[str, str], Histogram] = {}
+        self.items: dict[tuple[str, str], Histogram] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, endpoint: str, timings: Timings) -> None:
+        with self.lock:
+            for name, stage in list(timings.stages.items()):
+                key = (endpoint, name)
+                if stage.seconds is not None:
+                    self.seconds.setdefault(key, Histogram(SECONDS)).observe(stage.seconds)
+                if stage.items is not None:
+                    self.items.setdefault(key, Histogram(ITEMS)).observe(stage.items)
+
+    def stats(self) -> dict[str, dict[str, dict[str, typing.Any]]]:
+        with self.lock:
+            stats: dict[str, dict[str, dict[str, typing.Any]]] = {}
+
+            for kind, histograms in (("seconds", self.seconds), ("items", self.items)):
+                for (endpoint, name), histogram in histograms.items():
+                    stage = stats.setdefault(endpoint, {}).setdefault(name, {})
+                    stage[kind] = histogram.stats()
+
+            return stats
+
+
+def timed(chunks: typing.Iterable[T], timings: Timings, name: str) -> typing.Iterator[T]:
+    """Time how long it takes to produce every item of an iterable, such as a streamed page."""
+    with timings.stage(name):
+        yield from chunks
+
+
+def trailed(chunks: typing.Iterable[str], timings: Timings) -> typing.Iterator[str]:
+    """Stream a page, then end it with the timings, which weren't known when its headers were sent."""
+    yield from chunks
+    yield timings.comment()
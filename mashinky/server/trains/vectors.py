@@ -0,0 +1,271 @@
+"""
+An alternative to building a `Train` for every candidate.
+
+The catalog is turned into a `Matrix` of plain attribute columns, and each candidate is a `Vector`
+of (index, count) runs over that matrix. A vector's totals are computed once from the columns when
+it is built, so the generic pipeline stages can filter, deduplicate and sort candidates without
+walking ORM objects. Only the survivors are turned back into `Train` objects for rendering.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import itertools
+import math
+import typing
+
+from mashinky.models import CargoType, Engine, Wagon, WagonType
+from mashinky.server.trains.bounds import capacity_bound, exhausted
+from mashinky.server.trains.models import Train
+from mashinky.server.trains.options import Options
+
+Runs = tuple[tuple[int, int], ...]
+
+
+@dataclasses.dataclass(frozen=True)
+class Matrix:
+    """Attribute columns for a set of wagon types, indexed by position."""
+
+    wagon_types: tuple[WagonType, ...]
+    cargo_types: tuple[CargoType, ...]
+    index: dict[WagonType, int]
+
+    is_engine: tuple[bool, ...]
+    weight_empty: tuple[int, ...]
+    weight_full: tuple[int, ...]
+    length: tuple[float, ...]
+    capacity: tuple[int, ...]
+    cargo: tuple[typing.Optional[int], ...]
+    bonus_income: tuple[typing.Optional[int], ...]
+    recommended_weight: tuple[int, ...]
+
+    @classmethod
+    def build(cls, wagon_types: typing.Iterable[WagonType]) -> Matrix:
+        wagon_types = tuple({wagon_type: None for wagon_type in wagon_types}.keys())
+        cargo_types = tuple(
+            {wt.cargo_type: None for wt in wagon_types if wt.cargo_type is not None}.keys()
+        )
+        cargo_index = {cargo_type: i for i, cargo_type in enumerate(cargo_types)}
+
+        return cls(
+            wagon_types=wagon_types,
+            cargo_types=cargo_types,
+            index={wagon_type: i for i, wagon_type in enumerate(wagon_types)},
+            is_engine=tuple(isinstance(wt, Engine) for wt in wagon_types),
+            weight_empty=tuple(wt.weight_empty for wt in wagon_types),
+            weight_full=tuple(wt.weight_full for wt in wagon_types),
+            length=tuple(wt.length for wt in wagon_types),
+            capacity=tuple(wt.capacity for wt in wagon_types),
+            cargo=tuple(cargo_index.get(wt.cargo_type) for wt in wagon_types),
+            bonus_income=tuple(wt.bonus_income or None for wt in wagon_types),
+            recommended_weight=tuple(
+                wt.recommended_weight if isinstance(wt, Engine) else 0 for wt in wagon_types
+            ),
+        )
+
+    def compact(self) -> Matrix:
+        """A copy that refers to wagon types and cargo types by id, so it can be pickled."""
+        ids = tuple(wagon_type.id for wagon_type in self.wagon_types)
+        return dataclasses.replace(
+            self,
+            wagon_types=ids,
+            cargo_types=tuple(cargo_type.id for cargo_type in self.cargo_types),
+            index={id: i for i, id in enumerate(ids)},
+        )
+
+    def vector(self, wagon_types: typing.Sequence[WagonType]) -> Vector:
+        vector = Vector.EMPTY
+
+        for wagon_type, group in itertools.groupby(wagon_types):
+            vector += self.times(self.index[wagon_type], len(tuple(group)))
+
+        return vector
+
+    def times(self, i: int, count: int) -> Vector:
+        if count <= 0:
+            return Vector.EMPTY
+
+        cargo = {} if self.cargo[i] is None else {self.cargo[i]: self.capacity[i] * count}
+
+        return Vector(
+            runs=((i, count),),
+            engine_count=count if self.is_engine[i] else 0,
+            weight_empty=self.weight_empty[i] * count,
+            weight_full=self.weight_full[i] * count,
+            length=self.length[i] * count,
+            capacity=self.capacity[i] * count,
+            recommended_weight=self.recommended_weight[i] * count,
+            bonus=self.bonus_income[i],
+            cargo=cargo,
+        )
+
+    def train(self, vector: Vector) -> Train:
+        return Train((self.wagon_types[i], n) for i, n in vector.runs)
+
+
+class Vector:
+    """A candidate train as runs of wagon type indexes, with its totals precomputed."""
+
+    EMPTY: typing.ClassVar[Vector]
+
+    __slots__ = (
+        "runs",
+        "engine_count",
+        "weight_empty",
+        "weight_full",
+        "length",
+        "capacity",
+        "recommended_weight",
+        "bonus",
+        "cargo",
+    )
+
+    def __init__(
+        self,
+        runs: Runs,
+        engine_count: int,
+        weight_empty: int,
+        weight_full: int,
+        length: float,
+        capacity: int,
+        recommended_weight: int,
+        bonus: typing.Optional[int],
+        cargo: dict[int, int],
+    ):
+        self.runs = runs
+        self.engine_count = engine_count
+        self.weight_empty = weight_empty
+        self.weight_full = weight_full
+        # Rounded the same way as `Train.length`.
+        self.length = round(length, 2)
+        self.capacity = capacity
+        self.recommended_weight = recommended_weight
+        self.bonus = bonus
+        self.cargo = cargo
+
+    def __add__(self, other: Vector) -> Vector:
+        if not other.runs:
+            return self
+        if not self.runs:
+            return other
+
+        # Join the runs, merging the two ends if they are the same wagon type.
+        (i, a), (j, b) = self.runs[-1], other.runs[0]
+        if i == j:
+            runs = (*self.runs[:-1], (i, a + b), *other.runs[1:])
+        else:
+            runs = (*self.runs, *other.runs)
+
+        cargo = dict(self.cargo)
+        for cargo_index, amount in other.cargo.items():
+            cargo[cargo_index] = cargo.get(cargo_index, 0) + amount
+
+        return Vector(
+            runs=runs,
+            engine_count=self.engine_count + other.engine_count,
+            weight_empty=self.weight_empty + other.weight_empty,
+            weight_full=self.weight_full + other.weight_full,
+            length=self.length + other.length,
+            capacity=self.capacity + other.capacity,
+            recommended_weight=self.recommended_weight + other.recommended_weight,
+            bonus=max((b for b in (self.bonus, other.bonus) if b is not None), default=None),
+            cargo=cargo,
+        )
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Vector) and self.runs == other.runs
+
+    def __hash__(self) -> int:
+        return hash(self.runs)
+
+    def __repr__(self) -> str:
+        return "Vector[{}]".format(", ".join(f"{i} x{n}" for i, n in self.runs))
+
+    @property
+    def wagon_type_set(self) -> frozenset[int]:
+        return frozenset(i for i, _ in self.runs)
+
+    @property
+    def bonus_capacity(self) -> int:
+        multiplier = ((self.bonus or 0) + 100) / 100
+        return sum(round(multiplier * amount) for amount in self.cargo.values())
+
+
+Vector.EMPTY = Vector(
+    runs=(),
+    engine_count=0,
+    weight_empty=0,
+    weight_full=0,
+    length=0.0,
+    capacity=0,
+    recommended_weight=0,
+    bonus=None,
+    cargo={},
+)
+
+
+def generate_vectors(
+    matrix: Matrix,
+    selected_engines: typing.Sequence[Engine],
+    selected_wagons: typing.Sequence[Wagon],
+    suggestions: dict[Wagon, list[list[Wagon]]],
+    station_length_short: int,
+    station_length_long: int,
+    maximum_engines: int = 2,
+    options: typing.Optional[Options] = None,
+) -> typing.Iterable[Vector]:
+    """The same candidates as `generate_trains`, built from precomputed heads and tails."""
+    heads = {
+        engine: [matrix.times(matrix.index[engine], n) for n in range(1, maximum_engines + 1)]
+        for engine in selected_engines
+    }
+    tails = {
+        wagon: [Vector.EMPTY] + [matrix.vector(tail) for tail in suggestions.get(wagon, [])]
+        for wagon in selected_wagons
+    }
+
+    for engine, wagon in itertools.product(selected_engines, selected_wagons):
+        i = matrix.index[wagon]
+        single = matrix.times(i, 1)
+        best = [0 for _ in tails[wagon]]
+        bounded = [False for _ in tails[wagon]]
+        empty = [False for _ in tails[wagon]]
+        done = [False for _ in tails[wagon]]
+
+        for head in heads[engine]:
+            for t, tail in enumerate(tails[wagon]):
+                if done[t]:
+                    continue
+
+                weight_full = head.weight_full + tail.weight_full
+                length = round(head.length + tail.length, 2)
+                base = head + tail
+
+                if options is not None and not bounded[t]:
+                    bound = capacity_bound(options, base, heads[engine][0], single)
+                    bounded[t] = bound <= best[t]
+
+                # The same rules as `generate_trains`.
+                if bounded[t] and exhausted(options, base, empty[t]):
+                    done[t] = True
+                    continue
+
+                for count in (
+                    math.floor((head.recommended_weight - weight_full) / matrix.weight_full[i]),
+                    math.floor((station_length_short - length) / matrix.length[i]),
+                    math.floor((station_length_long - length) / matrix.length[i]),
+                ):
+                    vector = head + matrix.times(i, count) + tail
+
+                    if options is not None and count <= 0:
+                        empty[t] = empty[t] or options.should_include(vector)
+                    elif bounded[t]:
+                        continue
+                    elif options is not None and vector.capacity > best[t]:
+                        if options.should_include(vector):
+                            best[t] = vector.capacity
+
+                    yield vector
+
+            if all(done):
+                break
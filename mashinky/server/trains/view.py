@@ -0,0 +1,171 @@
+"""
+Everything `trains.html.j2` shows about each train, computed once per request.
+
+The train macros used to read the same properties of a train several times per row. Rows are built
+from the trains on the current page before rendering, so the template only formats values.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import typing
+
+from mashinky.models import TokenType, WagonType
+from mashinky.server.trains.generate import Results
+from mashinky.server.trains.models import Train
+from mashinky.server.trains.options import Options
+
+
+@dataclasses.dataclass(frozen=True)
+class Selection:
+    """The ids of the selected engines, wagons and cargo types, for checking membership."""
+
+    engine_ids: frozenset[str]
+    wagon_ids: frozenset[str]
+    cargo_ids: frozenset[str]
+
+    @classmethod
+    def from_results(cls, results: Results) -> Selection:
+        return cls(
+            engine_ids=frozenset(engine.id for engine in results.selected_engines),
+            wagon_ids=frozenset(wagon.id for wagon in results.selected_wagons),
+            cargo_ids=frozenset(cargo_type.id for cargo_type in results.selected_cargos),
+        )
+
+
+@dataclasses.dataclass(frozen=True)
+class Icon:
+    filename: str
+    name: str
+    id: str
+    width: float
+
+
+@dataclasses.dataclass(frozen=True)
+class CargoAmount:
+    filename: str
+    label: str
+    name: str
+    amount: int
+    bonus_amount: typing.Optional[int]
+
+
+@dataclasses.dataclass(frozen=True)
+class Payment:
+    filename: str
+    label: str
+    name: str
+    amount: int
+
+
+@dataclasses.dataclass(frozen=True)
+class Row:
+    icons: list[Icon]
+    tiles_width: int
+    long: bool
+
+    description: list[tuple[WagonType, int]]
+
+    cargo: list[CargoAmount]
+    bonus_incomes: list[WagonType]
+    best_bonus_capacity: bool
+    best_capacity: bool
+
+    max_speed: int
+    best_max_speed: bool
+
+    weight_empty: int
+    weight_full: int
+    recommended_weight: int
+    over_weight_empty: bool
+    over_weight_full: bool
+    weight_usage: str
+    best_weight_usage: bool
+
+    length: str
+    over_length_short: bool
+    over_length_long: bool
+    length_usage: str
+    best_length_usage: bool
+
+    cost: list[Payment]
+    fuel: list[Payment]
+
+
+class RowBuilder:
+    """Builds the rows for the trains on one page."""
+
+    def __init__(self, results: Results, options: Options, tile_width: int) -> None:
+        self.results = results
+        self.options = options
+        self.tile_width = tile_width
+
+    def rows(self, trains: typing.Iterable[Train]) -> list[Row]:
+        return [self.row(train) for train in trains]
+
+    def row(self, train: Train) -> Row:
+        results, options = self.results, self.options
+
+        long = train.length > options.station_length
+        tiles = options.station_length_long if long else options.station_length
+        weight_usage = train.weight_usage()
+        length_usage = train.length_usage(options.station_length)
+
+        return Row(
+            icons=[
+                Icon(
+                    filename=wagon_type.icon,
+                    name=wagon_type.name,
+                    id=wagon_type.id,
+                    width=self.tile_width * wagon_type.length,
+                )
+                for wagon_type in train
+            ],
+            tiles_width=self.tile_width * tiles + 1,
+            long=long,
+            description=list(train.wagon_type_counter.items()),
+            cargo=[
+                CargoAmount(
+                    filename=cargo_type.icon,
+                    label=str(cargo_type),
+                    name=cargo_type.name.lower(),
+                    amount=amount,
+                    bonus_amount=(
+                        train.bonus_cargo[cargo_type]
+                        if cargo_type.is_passengers and train.has_bonus
+                        else None
+                    ),
+                )
+                for cargo_type, amount in train.cargo.items()
+            ],
+            bonus_incomes=train.bonus_incomes,
+            best_bonus_capacity=train.bonus_capacity == results.best_bonus_capacity,
+            best_capacity=train.capacity == results.best_capacity,
+            max_speed=train.max_speed,
+            best_max_speed=train.max_speed == results.best_max_speed,
+            weight_empty=train.weight_empty,
+            weight_full=train.weight_full,
+            recommended_weight=train.recommended_weight,
+            over_weight_empty=train.is_over_recommended_weight_empty(),
+            over_weight_full=train.is_over_recommended_weight_full(),
+            weight_usage="{:.0%}".format(weight_usage),
+            best_weight_usage=weight_usage == results.best_weight_usage,
+            length="%.2f" % train.length,
+            over_length_short=train.length > options.station_length_short,
+            over_length_long=train.length > options.station_length_long,
+            length_usage="{:.0%}".format(length_usage),
+            best_length_usage=length_usage == results.best_length_usage,
+            cost=self.payments(train.cost),
+            fuel=self.payments(train.fuel),
+        )
+
+    def payments(self, payments: dict[TokenType, int]) -> list[Payment]:
+        return [
+            Payment(
+                filename=token_type.icon,
+                label=str(token_type),
+                name=str(token_type).lower(),
+                amount=amount,
+            )
+            for token_type, amount in payments.items()
+        ]
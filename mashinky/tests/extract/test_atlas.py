@@ -0,0 +1,30 @@
+import json
+import pathlib
+
+import PIL.Image
+
+from mashinky.extract.atlas import MANIFEST, AtlasFactory, pack
+
+
+def test_pack() -> None:
+    sizes = {"a": (40, 20), "b": (30, 30), "c": (40, 10)}
+    placements, width, height = pack(sizes, max_width=80)
+
+    assert [(p.filename, p.x, p.y) for p in placements] == [("b", 0, 0), ("a", 30, 0), ("c", 0, 30)]
+    assert (width, height) == (70, 40)
+
+
+def test_build(tmp_path: pathlib.Path) -> None:
+    group = tmp_path / "images" / "token_type"
+    group.mkdir(parents=True)
+    PIL.Image.new("RGBA", (8, 8), (255, 0, 0, 255)).save(group / "red.png")
+    PIL.Image.new("RGBA", (8, 4), (0, 0, 255, 255)).save(group / "blue.png")
+
+    AtlasFactory(directory=tmp_path).build()
+    manifest = json.loads((tmp_path / MANIFEST).read_text())
+
+    assert manifest["atlases"] == {"images/atlas/token_type.png": [16, 8]}
+    atlas, x, y, w, h = manifest["sprites"]["images/token_type/blue.png"]
+    with PIL.Image.open(tmp_path / atlas) as image:
+        assert image.getpixel((x, y)) == (0, 0, 255, 255)
+    assert (w, h) == (8, 4)
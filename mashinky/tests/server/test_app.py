@@ -0,0 +1,166 @@
+import concurrent.futures
+import importlib
+
+import pytest
+import sqlalchemy
+import sqlalchemy.orm
+
+from mashinky.models import Base, Epoch
+from mashinky.server.trains.admission import Admission
+from mashinky.server.trains.catalog import CatalogLoader
+from mashinky.server.trains.options import MAXIMUM_ENGINES
+from mashinky.server.trains.store import ResultStore
+from mashinky.tests.server.trains.conftest import small_catalog
+
+# The package exports the Flask app under the same name as the module it's in.
+server = importlib.import_module("mashinky.server.app")
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    """A client for the app, searching a database made from the test catalog."""
+    catalog = small_catalog()
+
+    for cargo_type in catalog.cargo_types:
+        cargo_type.epoch = Epoch.EARLY_STEAM
+        cargo_type.sell_immediately = False
+
+    path = tmp_path / "models.sqlite3"
+    engine = sqlalchemy.create_engine(f"sqlite:///{path}", future=True)
+    Base.metadata.create_all(engine)
+
+    with sqlalchemy.orm.Session(engine, expire_on_commit=False) as session:
+        session.add_all([*catalog.engines, *catalog.wagons, *catalog.cargo_types])
+        session.commit()
+
+    loader = CatalogLoader(path, lambda: sqlalchemy.orm.Session(engine))
+    monkeypatch.setattr(server, "catalog", loader)
+    return server.app.test_client()
+
+
+def test_search_trains(client) -> None:
+    response = client.get("/trains?epoch=1")
+
+    assert response.status_code == 200
+    assert "Collected" in response.text
+    assert "</html>" in response.text
+
+    # The search runs after the headers are sent, so its timings come at the end of the page.
+    assert "Server-Timing" not in response.headers
+    assert response.text.rstrip().endswith("-->")
+    assert "generate;dur=" in response.text.rsplit("Server-Timing:", 1)[1]
+
+
+def test_api_trains_timings(client) -> None:
+    response = client.get("/api/trains?epoch=1", buffered=True)
+
+    # The trains are streamed, but the search finished before the headers were sent.
+    assert response.status_code == 200
+    assert "generate;dur=" in response.headers["Server-Timing"]
+
+
+def test_api_trains_summary(client) -> None:
+    summary = client.get("/api/trains?epoch=1&summary=1")
+    trains = client.get("/api/trains?epoch=1&summary=false", buffered=True)
+
+    assert summary.mimetype == "application/json"
+    assert trains.mimetype == "application/x-ndjson"
+    assert len(trains.text.splitlines()) > 1
+
+
+def test_search_trains_failed(client, monkeypatch) -> None:
+    def submit_search(*args):
+        future = concurrent.futures.Future()
+        future.set_exception(ValueError("failed"))
+        return future
+
+    monkeypatch.setattr(server, "submit_search", submit_search)
+    response = client.get("/trains?epoch=1")
+
+    # The page was already being sent, so the error is shown in it rather than cutting it short.
+    assert response.status_code == 200
+    assert "The search failed" in response.text
+    assert "Collected" not in response.text
+    assert "</html>" in response.text
+
+
+def test_search_trains_etag(client) -> None:
+    server.results_cache.clear()
+
+    # The page is sent before the search finishes, so it is only tagged once its results are cached.
+    first = client.get("/trains?epoch=2")
+    assert first.headers.get("ETag") is None
+    assert "Collected" in first.text
+
+    tagged = client.get("/trains?epoch=2", buffered=True)
+    assert tagged.headers.get("ETag") is not None
+
+    revalidated = client.get("/trains?epoch=2", headers={"If-None-Match": tagged.headers["ETag"]})
+    assert revalidated.status_code == 304
+
+    # Profiles and background jobs are never tagged.
+    assert client.get("/trains?epoch=2&profile=cprofile").headers.get("ETag") is None
+    assert client.get("/trains?epoch=2&job=1").headers.get("ETag") is None
+
+
+def test_admission_cached_apart(client, monkeypatch, tmp_path) -> None:
+    server.results_cache.clear()
+    monkeypatch.setattr(server, "admission", Admission(solver=None, limit=1, refuse=None, top=1))
+    monkeypatch.setattr(server, "results_store", ResultStore(tmp_path / "results.sqlite3"))
+
+    # Jobs skip admission control, so they find every train.
+    job = client.post("/api/jobs?epoch=1").json
+    server.jobs.get(job["id"]).future.result(timeout=10)
+    everything = client.get(job["trains"]).text.splitlines()
+
+    # The same search with admission control is limited, rather than reusing the job's results.
+    limited = client.get("/api/trains?epoch=1").text.splitlines()
+
+    assert len(everything) > 1
+    assert limited == everything[:1]
+
+
+def test_job_trains(client, monkeypatch) -> None:
+    server.results_cache.clear()
+    monkeypatch.setattr(server, "admission", Admission(solver=None, limit=1, refuse=None, top=1))
+
+    waiting = client.get("/trains?epoch=1&job=1")
+    (job_id,) = [id for id in server.jobs.jobs if f"job_id={id}" in waiting.text]
+    trains = server.jobs.get(job_id).future.result(timeout=10).trains
+
+    # The page shows the job's results, which admission control didn't limit.
+    response = client.get(f"/trains?epoch=1&job_id={job_id}", buffered=True)
+    assert len(trains) > 1
+    assert f"Collected {len(trains)} trains" in response.text
+    assert response.headers.get("ETag") is None
+
+    assert client.get("/trains?epoch=1&job_id=missing").status_code == 404
+
+
+@pytest.mark.parametrize("value", ["0", "-3"])
+def test_maximum_engines_below_one(client, value) -> None:
+    assert client.get(f"/api/trains?epoch=1&maximum_engines={value}").status_code == 400
+
+
+@pytest.mark.parametrize("value", [0, -1])
+def test_limit_below_one(client, value) -> None:
+    assert client.get(f"/api/trains?epoch=1&limit={value}").status_code == 400
+
+
+def test_objective_unknown(client) -> None:
+    response = client.get("/api/trains?epoch=1&objective=max_speed&objective=bogus")
+
+    assert response.status_code == 400
+    assert "bogus" in response.text
+    assert "bonus_capacity" in response.text
+
+
+def test_maximum_engines_ceiling(client) -> None:
+    query = "epoch=1&maximum_length=infinite&maximum_weight=infinite&maximum_engines=100000000"
+
+    with server.app.test_request_context(f"/trains?{query}"):
+        options, *_ = server.parse_search()
+
+    # Nothing else bounds a search without limits, and jobs skip admission control.
+    assert options.maximum_engines == MAXIMUM_ENGINES
+    assert client.get(f"/api/trains?{query}&summary=1").status_code == 200
@@ -0,0 +1,26 @@
+import pathlib
+
+from mashinky.server.caching import etag, fingerprint, release
+
+
+def test_etag() -> None:
+    assert etag("a", ["b", 1]) == etag("a", ["b", 1])
+    assert etag("a", ["b", 1]) != etag("a", ["b", 2])
+
+
+def test_release(tmp_path: pathlib.Path) -> None:
+    (tmp_path / "page.html.j2").write_text("one")
+    before = release(tmp_path)
+    (tmp_path / "page.html.j2").write_text("two")
+
+    assert release(tmp_path) != before
+
+
+def test_fingerprint(tmp_path: pathlib.Path) -> None:
+    (tmp_path / "icon.png").write_bytes(b"one")
+    before = fingerprint(tmp_path, "icon.png")
+    (tmp_path / "icon.png").write_bytes(b"three")
+
+    assert before is not None
+    assert fingerprint(tmp_path, "icon.png") != before
+    assert fingerprint(tmp_path, "missing.png") is None
@@ -0,0 +1,23 @@
+from mashinky.server.sprites import Sprite, icon_html
+
+sprite = Sprite("atlas.png", atlas_width=200, atlas_height=100, x=50, y=20, w=40, h=20)
+
+
+def test_size() -> None:
+    assert sprite.size(None, None) == (40, 20)
+    assert sprite.size(80, None) == (80, 40)
+    assert sprite.size(None, 10) == (20, 10)
+
+
+def test_style() -> None:
+    assert sprite.style("/atlas.png", 80, 40) == (
+        "width: 80px; height: 40px; background: url(/atlas.png) -100px -40px / 400px 200px no-repeat;"
+    )
+
+
+def test_icon_html() -> None:
+    html = icon_html(sprite, lambda filename: f"/{filename}", "icon.png", "<Icon>", height=10)
+    assert html.startswith('<span class="app-sprite" role="img" aria-label="&lt;Icon&gt;"')
+
+    html = icon_html(None, lambda filename: f"/{filename}", "icon.png", "Icon", width=16)
+    assert html == '<img src="/icon.png" alt="Icon" width="16px">'
@@ -0,0 +1,187 @@
+import random
+import typing
+
+import pytest
+
+from mashinky.models import CargoType, Cost, Engine, Epoch, Fuel, TokenType, Track, Wagon
+from mashinky.server.trains.generate import (
+    generate_deduplicate,
+    generate_discard_empty,
+    generate_discard_extra,
+    generate_filter,
+    generate_sort,
+    generate_suggestions,
+)
+
+
+def engine(id: str, *, power: int, max_speed: int, weight: int, length: float, **kwargs) -> Engine:
+    return Engine(
+        id=id,
+        name=id,
+        icon=f"images/wagon_type_icon/{id}.png",
+        icon_color=f"images/wagon_type_icon_color/{id}.png",
+        epoch_start=Epoch.EARLY_STEAM,
+        epoch_end=Epoch.LATE_ELECTRIC,
+        track=Track.STANDARD,
+        weight_empty=weight,
+        weight_full=weight,
+        length=length,
+        capacity=0,
+        power=power,
+        max_speed=max_speed,
+        depo_upgrade=False,
+        quest_reward=False,
+        **kwargs,
+    )
+
+
+def wagon(
+    name: str,
+    cargo_type: CargoType,
+    *,
+    capacity: int,
+    weight_empty: int,
+    weight_full: int,
+    length: float,
+    **kwargs,
+) -> Wagon:
+    return Wagon(
+        id=name.upper().replace(" ", "_"),
+        name=name,
+        icon=f"images/wagon_type_icon/{name}.png",
+        icon_color=f"images/wagon_type_icon_color/{name}.png",
+        epoch_start=Epoch.EARLY_STEAM,
+        epoch_end=Epoch.LATE_ELECTRIC,
+        track=Track.STANDARD,
+        weight_empty=weight_empty,
+        weight_full=weight_full,
+        length=length,
+        cargo_type=cargo_type,
+        capacity=capacity,
+        depo_upgrade=False,
+        quest_reward=False,
+        **kwargs,
+    )
+
+
+class Catalog(typing.NamedTuple):
+    engines: list[Engine]
+    wagons: list[Wagon]
+    cargo_types: list[CargoType]
+    suggestions: dict[Wagon, list[list[Wagon]]]
+
+
+@pytest.fixture()
+def catalog() -> Catalog:
+    return small_catalog()
+
+
+def small_catalog() -> Catalog:
+    """A few engines and wagons with round stats, used by most tests."""
+    money = TokenType(id="F0000000", name="Money", icon="money.png")
+    coal = TokenType(id="C0A1", name="Coal", icon="coal.png")
+
+    passengers = CargoType(id="P", name="Passengers", color="ffffff", icon="p.png")
+    mail = CargoType(id="M", name="Mail", color="ffffff", icon="m.png")
+    logs = CargoType(id="L", name="Logs", color="ffffff", icon="l.png")
+
+    engines = [
+        engine(
+            "Small",
+            power=300,
+            max_speed=40,
+            weight=30,
+            length=1.0,
+            cost=[Cost(token_type=money, amount=100)],
+            fuel=[Fuel(token_type=coal, amount=2)],
+        ),
+        engine(
+            "Large",
+            power=700,
+            max_speed=60,
+            weight=60,
+            length=1.5,
+            cost=[Cost(token_type=money, amount=300)],
+            fuel=[Fuel(token_type=coal, amount=5)],
+        ),
+        engine("Fast", power=500, max_speed=90, weight=40, length=1.25),
+    ]
+    wagons = [
+        wagon("Coach car", passengers, capacity=20, weight_empty=10, weight_full=14, length=0.75),
+        wagon("1st Class", passengers, capacity=16, weight_empty=12, weight_full=15, length=0.75),
+        wagon(
+            "Pwg PR-14",
+            mail,
+            capacity=8,
+            weight_empty=8,
+            weight_full=10,
+            length=0.5,
+            bonus_income=15,
+        ),
+        wagon("Flatbed", logs, capacity=30, weight_empty=8, weight_full=20, length=1.0),
+    ]
+    cargo_types = [passengers, mail, logs]
+    suggestions = generate_suggestions(all_wagons=wagons, selected_wagons=wagons)
+
+    return Catalog(
+        engines=engines,
+        wagons=wagons,
+        cargo_types=cargo_types,
+        suggestions=suggestions,
+    )
+
+
+def random_catalog(seed: int) -> Catalog:
+    """A small catalog with random stats, where tails often reuse the wagons of other pairs."""
+    rng = random.Random(seed)
+    cargo_types = [
+        CargoType(id=str(i), name=f"Cargo {i}", color="ffffff", icon=f"{i}.png") for i in range(2)
+    ]
+    engines = [
+        engine(
+            f"E{i}",
+            power=rng.randint(100, 900),
+            max_speed=rng.randint(30, 120),
+            weight=rng.randint(20, 80),
+            length=rng.choice([0.75, 1.0, 1.25, 1.5, 2.0]),
+        )
+        for i in range(rng.randint(2, 4))
+    ]
+    wagons = []
+    for i in range(rng.randint(2, 5)):
+        weight_empty = rng.randint(5, 20)
+        wagons.append(
+            wagon(
+                f"W{i}",
+                rng.choice(cargo_types),
+                capacity=rng.randint(1, 40),
+                weight_empty=weight_empty,
+                weight_full=weight_empty + rng.randint(0, 20),
+                length=rng.choice([0.5, 0.75, 1.0]),
+                bonus_income=rng.choice([None, None, 10, 25]),
+            )
+        )
+    suggestions = {
+        w: [rng.sample(wagons, rng.randint(1, 2)) for _ in range(rng.randint(0, 2))] for w in wagons
+    }
+
+    return Catalog(
+        engines=engines,
+        wagons=wagons,
+        cargo_types=cargo_types,
+        suggestions=suggestions,
+    )
+
+
+@pytest.fixture()
+def pipeline() -> typing.Callable:
+    """Run the stages of `generate` that come after generating candidates."""
+
+    def pipeline(trains, options):
+        trains = list(generate_deduplicate(trains))
+        trains = list(generate_filter(trains, options))
+        trains = list(generate_discard_empty(trains))
+        trains = list(generate_discard_extra(trains))
+        return list(generate_sort(trains))
+
+    return pipeline
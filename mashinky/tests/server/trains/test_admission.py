@@ -0,0 +1,58 @@
+from mashinky.models import Epoch
+from mashinky.server.trains.admission import Admission, predict_candidates
+from mashinky.server.trains.generate import generate_trains
+from mashinky.server.trains.options import Options, Strategy
+
+options = Options(epoch=Epoch.EARLY_STEAM, include_depo_upgrade=False, include_quest_reward=False)
+
+
+def test_predict_candidates(catalog) -> None:
+    candidates = generate_trains(
+        selected_engines=catalog.engines,
+        selected_wagons=catalog.wagons,
+        suggestions=catalog.suggestions,
+        station_length_short=options.station_length_short,
+        station_length_long=options.station_length_long,
+        maximum_engines=options.maximum_engines,
+    )
+
+    predicted = predict_candidates(catalog.engines, catalog.wagons, catalog.suggestions, options)
+    assert predicted == len(list(candidates))
+
+
+def test_admit() -> None:
+    decision = Admission(solver=100, limit=200, refuse=300).decide(options, 100)
+
+    assert decision.options == options
+    assert decision.message is None
+    assert not decision.refused
+
+
+def test_solver() -> None:
+    decision = Admission(solver=100, limit=200, refuse=300).decide(options, 150)
+
+    assert decision.options.strategy == Strategy.SOLVER
+    assert decision.options.limit is None
+    assert decision.message == "This search would build 150 trains, so it used the solver."
+
+
+def test_limit() -> None:
+    decision = Admission(solver=100, limit=200, refuse=300, top=10).decide(options, 250)
+
+    assert decision.options.strategy == Strategy.SOLVER
+    assert decision.options.limit == 10
+    assert not decision.refused
+
+
+def test_refuse() -> None:
+    decision = Admission(solver=100, limit=200, refuse=300).decide(options, 301)
+
+    assert decision.refused
+    assert decision.message.startswith("This search would build 301 trains, more than the limit")
+
+
+def test_disabled() -> None:
+    decision = Admission(solver=None, limit=None, refuse=None).decide(options, 10**9)
+
+    assert decision.options == options
+    assert not decision.refused
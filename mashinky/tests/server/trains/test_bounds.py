@@ -0,0 +1,164 @@
+import dataclasses
+import itertools
+import math
+
+import pytest
+
+import mashinky.server.trains.solver
+from mashinky.models import Epoch
+from mashinky.server.trains.bounds import capacity_bound, maximum_heads
+from mashinky.server.trains.generate import generate_memoised, generate_trains
+from mashinky.server.trains.incremental import SliceCache
+from mashinky.server.trains.models import Train
+from mashinky.server.trains.options import MaximumLength, MaximumWeight, Options, Strategy
+from mashinky.server.trains.solver import generate_solved_trains, generate_solved_vectors
+from mashinky.server.trains.timing import Timings
+from mashinky.server.trains.vectors import Matrix, generate_vectors
+from mashinky.tests.server.trains.conftest import random_catalog
+
+
+def make_options(maximum_weight, maximum_length, maximum_engines, **kwargs) -> Options:
+    return Options(
+        epoch=Epoch.EARLY_STEAM,
+        include_depo_upgrade=False,
+        include_quest_reward=False,
+        maximum_engines=maximum_engines,
+        maximum_weight=maximum_weight,
+        maximum_length=maximum_length,
+        station_length_short=12,
+        station_length_long=20,
+        **kwargs,
+    )
+
+
+@pytest.mark.parametrize("maximum_weight", list(MaximumWeight))
+@pytest.mark.parametrize("maximum_length", list(MaximumLength))
+def test_capacity_bound(catalog, maximum_weight, maximum_length) -> None:
+    options = make_options(maximum_weight, maximum_length, maximum_engines=12)
+
+    for engine, wagon in itertools.product(catalog.engines, catalog.wagons):
+        capacities = []
+
+        for n in range(1, options.maximum_engines + 1):
+            count = options.maximum_wagons(Train(((engine, n),)), wagon)
+            capacities.append(-1 if count is None else count * wagon.capacity)
+
+        bounds = [
+            capacity_bound(options, Train(((engine, n),)), engine, wagon)
+            for n in range(1, options.maximum_engines + 1)
+        ]
+
+        # Each bound is at least the best train with that many engines or more.
+        assert all(b >= max(capacities[n:]) for n, b in enumerate(bounds))
+        assert bounds == sorted(bounds, reverse=True)
+
+
+@pytest.mark.parametrize("maximum_weight", list(MaximumWeight))
+@pytest.mark.parametrize("maximum_length", list(MaximumLength))
+@pytest.mark.parametrize("maximum_engines", [1, 2, 6])
+def test_generate_trains(
+    catalog, pipeline, maximum_weight, maximum_length, maximum_engines
+) -> None:
+    options = make_options(maximum_weight, maximum_length, maximum_engines)
+    kwargs = dict(
+        selected_engines=catalog.engines,
+        selected_wagons=catalog.wagons,
+        suggestions=catalog.suggestions,
+        station_length_short=options.station_length_short,
+        station_length_long=options.station_length_long,
+        maximum_engines=options.maximum_engines,
+    )
+    tail_wagons = (w for tails in catalog.suggestions.values() for tail in tails for w in tail)
+    matrix = Matrix.build([*catalog.engines, *catalog.wagons, *tail_wagons])
+
+    candidates = list(generate_trains(**kwargs))
+    bounded = list(generate_trains(**kwargs, options=options))
+    vectors = [matrix.train(v) for v in generate_vectors(matrix, **kwargs, options=options)]
+
+    # Only trains that would be discarded for having extra engines are skipped.
+    assert pipeline(bounded, options) == pipeline(candidates, options)
+    assert vectors == bounded
+
+    if maximum_length != MaximumLength.INFINITE and maximum_engines > 2:
+        assert len(bounded) < len(candidates)
+
+
+@pytest.mark.parametrize("maximum_weight", list(MaximumWeight))
+@pytest.mark.parametrize("maximum_length", list(MaximumLength))
+def test_solver(catalog, monkeypatch, maximum_weight, maximum_length) -> None:
+    options = make_options(maximum_weight, maximum_length, 12, strategy=Strategy.SOLVER)
+    matrix = Matrix.build(itertools.chain(catalog.engines, catalog.wagons))
+
+    bounded = list(
+        generate_solved_trains(catalog.engines, catalog.wagons, catalog.suggestions, options)
+    )
+    vectors = list(
+        generate_solved_vectors(
+            matrix, catalog.engines, catalog.wagons, catalog.suggestions, options
+        )
+    )
+
+    monkeypatch.setattr(mashinky.server.trains.solver, "capacity_bound", lambda *_: math.inf)
+    unbounded = list(
+        generate_solved_trains(catalog.engines, catalog.wagons, catalog.suggestions, options)
+    )
+
+    assert bounded == unbounded
+    assert [matrix.train(v) for v in vectors] == bounded
+
+
+def test_maximum_heads(catalog) -> None:
+    small, large, _ = catalog.engines
+    options = make_options(MaximumWeight.FULL, MaximumLength.SHORT, maximum_engines=20)
+
+    assert maximum_heads(small, options) == 12
+    assert maximum_heads(large, options) == 8
+
+    infinite = make_options(MaximumWeight.FULL, MaximumLength.INFINITE, maximum_engines=20)
+    assert maximum_heads(small, infinite) == 20
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("stations", [(6, 8), (12, 20)])
+def test_generate_trains_random(pipeline, seed, stations) -> None:
+    catalog = random_catalog(seed)
+
+    for maximum_weight, maximum_length, maximum_engines in itertools.product(
+        list(MaximumWeight), list(MaximumLength), [1, 2, 4]
+    ):
+        options = dataclasses.replace(
+            make_options(maximum_weight, maximum_length, maximum_engines),
+            station_length_short=stations[0],
+            station_length_long=stations[1],
+        )
+        kwargs = dict(
+            selected_engines=catalog.engines,
+            selected_wagons=catalog.wagons,
+            suggestions=catalog.suggestions,
+            station_length_short=options.station_length_short,
+            station_length_long=options.station_length_long,
+            maximum_engines=options.maximum_engines,
+        )
+        tail_wagons = (w for tails in catalog.suggestions.values() for tail in tails for w in tail)
+        matrix = Matrix.build([*catalog.engines, *catalog.wagons, *tail_wagons])
+        memo = SliceCache()
+
+        expected = pipeline(generate_trains(**kwargs), options)
+        bounded = list(generate_trains(**kwargs, options=options))
+        vectors = [matrix.train(v) for v in generate_vectors(matrix, **kwargs, options=options)]
+        memoised = [
+            train
+            for engine, wagon in itertools.product(catalog.engines, catalog.wagons)
+            for train in generate_memoised(
+                memo,
+                engine,
+                wagon,
+                catalog.suggestions.get(wagon, []),
+                options,
+                Timings(),
+            )
+        ]
+
+        assert pipeline(bounded, options) == expected
+        assert vectors == bounded
+        assert pipeline(memoised, options) == expected
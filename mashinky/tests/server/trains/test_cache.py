@@ -0,0 +1,41 @@
+from mashinky.models import Epoch
+from mashinky.server.trains.cache import LRUCache
+from mashinky.server.trains.options import Objective, Options
+
+
+def test_lru_cache() -> None:
+    cache = LRUCache(maxsize=2)
+    cache.check((1, 1))
+    cache.put("a", 1)
+    cache.put("b", 2)
+
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.stats() == {"size": 2, "maxsize": 2, "hits": 2, "misses": 1}
+
+    cache.check((1, 1))
+    assert len(cache) == 2
+    cache.check((2, 1))
+    assert len(cache) == 0
+
+
+def test_options_normalise() -> None:
+    a = Options(
+        epoch=Epoch.STEAM,
+        include_depo_upgrade=False,
+        include_quest_reward=False,
+        objectives=(Objective.MAX_SPEED, Objective.BONUS_CAPACITY, Objective.MAX_SPEED),
+    )
+    b = Options(
+        epoch=Epoch.STEAM,
+        include_depo_upgrade=False,
+        include_quest_reward=False,
+        objectives=(Objective.BONUS_CAPACITY, Objective.MAX_SPEED),
+    )
+
+    assert a != b
+    assert a.normalise() == b.normalise()
+    assert hash(a.normalise()) == hash(b.normalise())
@@ -0,0 +1,57 @@
+import sqlalchemy
+import sqlalchemy.orm
+
+from mashinky.models import Base, Epoch
+from mashinky.server.trains.catalog import Catalog
+from mashinky.tests.server.trains.conftest import wagon
+
+
+def test_catalog_load(catalog) -> None:
+    for cargo_type in catalog.cargo_types:
+        cargo_type.epoch = Epoch.EARLY_STEAM
+        cargo_type.sell_immediately = False
+
+    engine = sqlalchemy.create_engine("sqlite://", future=True)
+    Base.metadata.create_all(engine)
+
+    with sqlalchemy.orm.Session(engine, expire_on_commit=False) as session:
+        session.add_all([*catalog.engines, *catalog.wagons, *catalog.cargo_types])
+        session.commit()
+
+    with sqlalchemy.orm.Session(engine) as session:
+        snapshot = Catalog.load(session, build=(0, 0), digest="")
+
+    # Everything used to render a train can be read after the session is closed.
+    engines = snapshot.search_engines(epoch=Epoch.STEAM)
+    assert [e.id for e in engines] == sorted(e.id for e in catalog.engines)
+    assert [c.token_type.name for e in engines for c in e.cost] == ["Money", "Money"]
+    assert {w.cargo_type.name for w in snapshot.search_wagons()} == {"Passengers", "Mail", "Logs"}
+
+
+def test_catalog_search(catalog) -> None:
+    kwargs = dict(capacity=1, weight_empty=1, weight_full=1, length=1.0)
+    steam = wagon("Steam only", catalog.cargo_types[0], **kwargs)
+    steam.epoch_start = steam.epoch_end = Epoch.STEAM
+    reward = wagon("Reward", catalog.cargo_types[0], **kwargs)
+    reward.epoch_start = reward.epoch_end = None
+    reward.quest_reward = True
+
+    for cargo_type, epoch in zip(catalog.cargo_types, [Epoch.EARLY_STEAM, Epoch.STEAM, None]):
+        cargo_type.epoch = epoch
+
+    snapshot = Catalog.build_from((0, 0), "", [*catalog.wagons, steam, reward], catalog.cargo_types)
+
+    assert steam not in snapshot.search_wagons(epoch=Epoch.EARLY_STEAM)
+    assert steam in snapshot.search_wagons(epoch=Epoch.STEAM)
+    assert reward in snapshot.search_wagons(epoch=Epoch.LATE_ELECTRIC)
+    assert reward not in snapshot.search_wagons(epoch=Epoch.LATE_ELECTRIC, quest_reward=False)
+    assert snapshot.search_wagons(ids=["FLATBED", "COACH_CAR"]) == [
+        catalog.wagons[0],
+        catalog.wagons[3],
+    ]
+
+    assert [c.name for c in snapshot.search_cargo_types(epoch=Epoch.EARLY_STEAM)] == ["Passengers"]
+    assert [c.name for c in snapshot.search_cargo_types(epoch=Epoch.STEAM)] == [
+        "Mail",
+        "Passengers",
+    ]
@@ -0,0 +1,72 @@
+import random
+
+from mashinky.server.trains.dominance import (
+    discard_dominated,
+    discard_dominated_stream,
+    dominates,
+    pareto_frontier,
+)
+
+
+def discard_dominated_quadratic(items):
+    return [
+        (g, c, v)
+        for (g, c, v) in items
+        if not any(g == og and c > oc and v <= ov for (og, oc, ov) in items)
+    ]
+
+
+def test_discard_dominated() -> None:
+    rng = random.Random(0)
+    items = [(rng.randint(0, 5), rng.randint(1, 4), rng.randint(0, 20)) for _ in range(500)]
+
+    actual = discard_dominated(
+        items,
+        group=lambda item: item[0],
+        cost=lambda item: item[1],
+        value=lambda item: item[2],
+    )
+
+    assert actual == discard_dominated_quadratic(items)
+
+
+def test_discard_dominated_keeps_equal_cost() -> None:
+    items = [("a", 1, 10), ("a", 1, 5), ("a", 2, 10), ("a", 2, 11)]
+
+    actual = discard_dominated(items, lambda i: i[0], lambda i: i[1], lambda i: i[2])
+
+    assert actual == [("a", 1, 10), ("a", 1, 5), ("a", 2, 11)]
+
+
+def test_discard_dominated_stream() -> None:
+    rng = random.Random(0)
+    items = [(rng.randint(0, 5), rng.randint(1, 4), rng.randint(0, 20)) for _ in range(500)]
+
+    # Cheaper items often come after the items they dominate.
+    actual = discard_dominated_stream(
+        iter(items),
+        group=lambda item: item[0],
+        cost=lambda item: item[1],
+        value=lambda item: item[2],
+    )
+
+    assert list(actual) == discard_dominated_quadratic(items)
+
+
+def pareto_frontier_quadratic(items):
+    return [a for a in items if not any(dominates(b, a) for b in items)]
+
+
+def test_pareto_frontier() -> None:
+    rng = random.Random(0)
+    items = [tuple(rng.randint(0, 10) for _ in range(3)) for _ in range(500)]
+
+    actual = pareto_frontier(items, scores=lambda item: item)
+
+    assert actual == pareto_frontier_quadratic(items)
+
+
+def test_pareto_frontier_keeps_ties() -> None:
+    items = [(1, 2), (2, 1), (1, 2), (1, 1)]
+
+    assert pareto_frontier(items, scores=lambda item: item) == [(1, 2), (2, 1), (1, 2)]
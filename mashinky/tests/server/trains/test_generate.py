@@ -0,0 +1,341 @@
+import collections
+import dataclasses
+
+import pytest
+
+from mashinky.models import Epoch
+from mashinky.server.trains.deadline import Deadline
+from mashinky.server.trains.generate import (
+    generate_anytime,
+    generate_candidates,
+    generate_incremental,
+    generate_ranked,
+    generate_sharded,
+    generate_stages,
+    generate_stream,
+    generate_top,
+    generate_trains,
+    generate_unranked,
+)
+from mashinky.server.trains.incremental import SliceCache
+from mashinky.server.trains.models import Train
+from mashinky.server.trains.options import (
+    Evaluation,
+    MaximumLength,
+    MaximumWeight,
+    Objective,
+    Options,
+    Strategy,
+)
+from mashinky.server.trains.timing import Timings
+from mashinky.server.trains.vectors import Matrix
+from mashinky.tests.server.trains.conftest import random_catalog
+
+
+@pytest.mark.parametrize("maximum_length", list(MaximumLength))
+@pytest.mark.parametrize("limit", [1, 5, 1000])
+def test_generate_stream(catalog, pipeline, maximum_length, limit) -> None:
+    options = Options(
+        epoch=Epoch.EARLY_STEAM,
+        include_depo_upgrade=False,
+        include_quest_reward=False,
+        maximum_length=maximum_length,
+        limit=limit,
+    )
+    candidates = list(
+        generate_trains(
+            selected_engines=catalog.engines,
+            selected_wagons=catalog.wagons,
+            suggestions=catalog.suggestions,
+            station_length_short=options.station_length_short,
+            station_length_long=options.station_length_long,
+            maximum_engines=options.maximum_engines,
+        )
+    )
+    counts = collections.Counter()
+
+    expected = pipeline(candidates, options)
+    actual = list(generate_top(generate_stream(iter(candidates), options, counts), limit))
+
+    assert actual == expected[:limit]
+    assert counts["generate"] == len(candidates)
+    assert counts["discard_extra"] == len(expected)
+
+
+def assert_stream_counts(counts, expected_counts) -> None:
+    """Check the counts of `generate_stream` against the counts of `generate_stages`."""
+    # Only duplicates inside the limits are found, the rest are counted as over the limits.
+    assert counts["deduplicate"] >= expected_counts["deduplicate"]
+    for stage in ["generate", "filter", "discard_empty", "discard_extra"]:
+        assert counts[stage] == expected_counts[stage]
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_generate_stream_random(seed) -> None:
+    catalog = random_catalog(seed)
+    options = Options(
+        epoch=Epoch.EARLY_STEAM,
+        include_depo_upgrade=False,
+        include_quest_reward=False,
+        maximum_engines=3,
+        maximum_length=MaximumLength.LONG,
+    )
+    candidates = list(
+        generate_candidates(catalog.engines, catalog.wagons, catalog.suggestions, options)
+    )
+
+    expected, expected_counts = generate_stages(candidates, options)
+    limited = dataclasses.replace(options, limit=10**6)
+    actual, counts = generate_stages(candidates, limited)
+
+    assert set(actual) == set(expected)
+    assert_stream_counts(counts, expected_counts)
+
+
+@pytest.mark.parametrize("strategy", list(Strategy))
+@pytest.mark.parametrize("limit", [None, 3])
+def test_generate_sharded(catalog, strategy, limit) -> None:
+    options = Options(
+        epoch=Epoch.EARLY_STEAM,
+        include_depo_upgrade=False,
+        include_quest_reward=False,
+        strategy=strategy,
+        limit=limit,
+    )
+    tail_wagons = (w for tails in catalog.suggestions.values() for tail in tails for w in tail)
+    matrix = Matrix.build([*catalog.engines, *catalog.wagons, *tail_wagons])
+
+    candidates = generate_candidates(
+        catalog.engines, catalog.wagons, catalog.suggestions, options, matrix
+    )
+    expected, expected_counts = generate_stages(candidates, options)
+    actual, actual_counts = generate_sharded(
+        matrix, catalog.engines, catalog.wagons, catalog.suggestions, options, processes=2
+    )
+
+    # Each shard keeps its own best trains, so only compare the best trains overall.
+    keep = limit or len(expected)
+    assert list(generate_top(actual, keep)) == list(generate_top(expected, keep))
+    assert actual_counts == expected_counts
+
+
+@pytest.mark.parametrize("strategy", list(Strategy))
+def test_generate_incremental(catalog, strategy) -> None:
+    memo = SliceCache()
+    searches = []
+
+    for maximum_weight in [MaximumWeight.FULL, MaximumWeight.EMPTY, MaximumWeight.FULL]:
+        options = Options(
+            epoch=Epoch.EARLY_STEAM,
+            include_depo_upgrade=False,
+            include_quest_reward=False,
+            maximum_weight=maximum_weight,
+            strategy=strategy,
+        )
+        candidates = generate_candidates(
+            catalog.engines, catalog.wagons, catalog.suggestions, options
+        )
+        expected, expected_counts = generate_stages(candidates, options)
+        actual, counts = generate_incremental(
+            memo, catalog.engines, catalog.wagons, catalog.suggestions, options
+        )
+
+        assert actual == expected
+        assert counts == expected_counts
+        searches.append((memo.hits, memo.misses))
+
+    (_, first), (hits, misses), (_, last) = searches
+
+    # The heuristics' candidates don't depend on the limits, so changing a limit reuses them.
+    if strategy == Strategy.HEURISTIC:
+        assert hits > 0 and misses == first
+    else:
+        assert hits == 0 and misses > first
+
+    # Changing the limit back only reuses candidates.
+    assert last == misses
+
+
+def test_generate_incremental_timings(catalog) -> None:
+    options = Options(
+        epoch=Epoch.EARLY_STEAM, include_depo_upgrade=False, include_quest_reward=False
+    )
+    timings = Timings()
+
+    generate_incremental(
+        SliceCache(), catalog.engines, catalog.wagons, catalog.suggestions, options, timings
+    )
+
+    # Building the candidates is part of generating them, even when it happens outside the stages.
+    generate, slices = timings.stages["generate"], timings.stages["slices"]
+    assert generate.seconds >= slices.seconds > 0
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_generate_incremental_random(seed) -> None:
+    catalog = random_catalog(seed)
+    memo = SliceCache()
+
+    for maximum_length in [MaximumLength.SHORT, MaximumLength.LONG, MaximumLength.INFINITE]:
+        options = Options(
+            epoch=Epoch.EARLY_STEAM,
+            include_depo_upgrade=False,
+            include_quest_reward=False,
+            maximum_engines=4,
+            maximum_length=maximum_length,
+        )
+        candidates = generate_candidates(
+            catalog.engines, catalog.wagons, catalog.suggestions, options
+        )
+        expected = generate_stages(candidates, options)
+        actual = generate_incremental(
+            memo, catalog.engines, catalog.wagons, catalog.suggestions, options
+        )
+
+        assert actual == expected
+
+
+@pytest.mark.parametrize("strategy", list(Strategy))
+def test_generate_anytime(catalog, strategy) -> None:
+    options = Options(
+        epoch=Epoch.EARLY_STEAM,
+        include_depo_upgrade=False,
+        include_quest_reward=False,
+        strategy=strategy,
+    )
+    candidates = generate_candidates(catalog.engines, catalog.wagons, catalog.suggestions, options)
+    expected, expected_counts = generate_stages(candidates, options)
+    deadline = Deadline.after(60)
+    actual, counts = generate_anytime(
+        catalog.engines, catalog.wagons, catalog.suggestions, options, deadline
+    )
+
+    assert set(actual) == set(expected)
+    assert_stream_counts(counts, expected_counts)
+    assert not deadline.expired
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_generate_anytime_random(seed) -> None:
+    catalog = random_catalog(seed)
+    memo = SliceCache()
+
+    for strategy in Strategy:
+        options = Options(
+            epoch=Epoch.EARLY_STEAM,
+            include_depo_upgrade=False,
+            include_quest_reward=False,
+            maximum_engines=4,
+            strategy=strategy,
+        )
+        candidates = generate_candidates(
+            catalog.engines, catalog.wagons, catalog.suggestions, options
+        )
+        expected, expected_counts = generate_stages(candidates, options)
+
+        for cache in [None, memo]:
+            actual, counts = generate_anytime(
+                catalog.engines,
+                catalog.wagons,
+                catalog.suggestions,
+                options,
+                Deadline.after(60),
+                memo=cache,
+            )
+
+            assert set(actual) == set(expected)
+            assert_stream_counts(counts, expected_counts)
+
+
+def test_generate_ranked_deadline_memo(catalog) -> None:
+    options = Options(
+        epoch=Epoch.EARLY_STEAM,
+        include_depo_upgrade=False,
+        include_quest_reward=False,
+    )
+    memo = SliceCache()
+    args = (catalog.engines, catalog.wagons, catalog.suggestions, options)
+
+    expected, _ = generate_ranked(*args)
+    first, _ = generate_ranked(*args, memo=memo, deadline=Deadline.after(60))
+    second, _ = generate_ranked(*args, memo=memo, deadline=Deadline.after(60))
+
+    # A search with a deadline still reuses the candidates of earlier searches.
+    assert first == second
+    assert set(first) == set(expected)
+    assert memo.hits > 0
+
+
+def test_generate_ranked_vectors_skip_memo(catalog) -> None:
+    options = Options(
+        epoch=Epoch.EARLY_STEAM,
+        include_depo_upgrade=False,
+        include_quest_reward=False,
+        evaluation=Evaluation.VECTORS,
+    )
+    memo = SliceCache()
+    args = (catalog.engines, catalog.wagons, catalog.suggestions, options)
+
+    # Asking for vectors is never overridden by the memo, which holds trains.
+    assert generate_ranked(*args, memo=memo) == generate_ranked(*args)
+    assert (memo.hits, memo.misses, len(memo)) == (0, 0, 0)
+
+
+def test_generate_anytime_expired(catalog) -> None:
+    options = Options(
+        epoch=Epoch.EARLY_STEAM, include_depo_upgrade=False, include_quest_reward=False
+    )
+    deadline = Deadline(at=0)
+    actual, counts = generate_anytime(
+        catalog.engines, catalog.wagons, catalog.suggestions, options, deadline
+    )
+    candidates = generate_candidates(catalog.engines, catalog.wagons, catalog.suggestions, options)
+    expected, _ = generate_stages(candidates, options)
+
+    # Only the most promising pair is explored.
+    assert deadline.expired
+    assert 0 < len(actual) < len(expected)
+    assert len({train.runs[0][0] for train in actual}) == 1
+
+
+@pytest.mark.parametrize("limit", [1, 3])
+def test_generate_ranked_frontier_before_limit(catalog, limit) -> None:
+    options = Options(
+        epoch=Epoch.EARLY_STEAM,
+        include_depo_upgrade=False,
+        include_quest_reward=False,
+        objectives=(Objective.BONUS_CAPACITY, Objective.COST),
+        limit=limit,
+    )
+    unlimited = dataclasses.replace(options, limit=None)
+    everything, _ = generate_ranked(catalog.engines, catalog.wagons, catalog.suggestions, unlimited)
+    actual, counts = generate_ranked(catalog.engines, catalog.wagons, catalog.suggestions, options)
+
+    # The limit keeps the best trains on the whole frontier, not the frontier of the best trains.
+    assert actual == everything[:limit]
+    assert counts["frontier"] == len(everything)
+
+
+def test_weight_usage_objective(catalog) -> None:
+    small, flatbed = catalog.engines[0], catalog.wagons[3]
+    under, full, over = (Train(((small, 1), (flatbed, n))) for n in (7, 14, 20))
+    scores = [Objective.WEIGHT_USAGE.score(train) for train in (under, full, over)]
+
+    # Closer to the recommended weight is better, but going over it is worse than any train under.
+    assert scores[0] < scores[1]
+    assert scores[2] < scores[0]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_generate_unranked(seed) -> None:
+    catalog = random_catalog(seed)
+    options = Options(
+        epoch=Epoch.EARLY_STEAM,
+        include_depo_upgrade=False,
+        include_quest_reward=False,
+        maximum_engines=3,
+    )
+    expected, _ = generate_ranked(catalog.engines, catalog.wagons, catalog.suggestions, options)
+    actual = generate_unranked(catalog.engines, catalog.wagons, catalog.suggestions, options)
+
+    assert sorted(actual, key=repr) == sorted(expected, key=repr)
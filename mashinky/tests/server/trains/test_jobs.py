@@ -0,0 +1,52 @@
+import threading
+
+from mashinky.server.trains.jobs import Jobs
+from mashinky.server.trains.offload import Offload
+from mashinky.server.trains.timing import Timings
+
+
+def test_jobs() -> None:
+    jobs = Jobs(Offload(workers=1, queue=4))
+    event = threading.Event()
+
+    running = jobs.submit("a", Timings(), event.wait)
+    queued = jobs.submit("b", Timings(), lambda: 2)
+
+    assert jobs.submit("a", Timings(), event.wait) is running
+    assert jobs.get(running.id) is running
+    assert queued.status == "queued"
+
+    event.set()
+    assert queued.future.result() == 2
+    assert running.status == "done"
+    assert jobs.submit("a", Timings(), lambda: 3) is not running
+
+
+def test_progress() -> None:
+    timings = Timings()
+    timings.advance(3, 4)
+    timings.count("generate", 10)
+
+    job = Jobs(Offload(workers=1, queue=0)).submit("a", timings, lambda: 1 / 0)
+    job.future.exception()
+    progress = job.progress()
+
+    assert progress["status"] == "failed"
+    assert progress["error"] == "division by zero"
+    assert progress["pairs"] == {"done": 3, "total": 4}
+    assert progress["stages"] == {"generate": {"seconds": None, "items": 10}}
+
+
+def test_evict() -> None:
+    jobs = Jobs(Offload(workers=1, queue=4), keep=1)
+    first = jobs.submit("a", Timings(), lambda: 1)
+    first.future.result()
+    second = jobs.submit("b", Timings(), lambda: 2)
+    second.future.result()
+    event = threading.Event()
+    third = jobs.submit("c", Timings(), event.wait)
+
+    assert jobs.get(first.id) is None
+    assert jobs.get(second.id) is second
+    assert jobs.get(third.id) is third
+    event.set()
@@ -0,0 +1,35 @@
+from mashinky.server.trains.models import Train
+
+
+def test_train_runs(catalog) -> None:
+    small = catalog.engines[0]
+    coach, first, mail, _ = catalog.wagons
+
+    train = Train.from_wagon_types([small, small, coach, coach, coach, first, mail])
+
+    assert train.runs == ((small, 2), (coach, 3), (first, 1), (mail, 1))
+    assert list(train) == [small, small, coach, coach, coach, first, mail]
+    assert train.engine_count == 2
+    assert train.weight_full == 2 * 30 + 3 * 14 + 15 + 10
+    assert train.cargo == {coach.cargo_type: 3 * 20 + 16, mail.cargo_type: 8}
+
+
+def test_train_equality(catalog) -> None:
+    small = catalog.engines[0]
+    coach = catalog.wagons[0]
+
+    a = Train(((small, 1), (coach, 2), (coach, 1), (small, 0)))
+    b = Train.from_wagon_types([small, coach, coach, coach])
+
+    assert a == b
+    assert hash(a) == hash(b)
+    assert a != Train(((small, 1), (coach, 2)))
+
+
+def test_train_add_wagons(catalog) -> None:
+    small = catalog.engines[0]
+    coach, _, mail, _ = catalog.wagons
+
+    train = Train(((small, 2), (mail, 1))).add_wagons(coach, 4)
+
+    assert train.runs == ((small, 2), (coach, 4), (mail, 1))
@@ -0,0 +1,65 @@
+import threading
+
+import pytest
+
+from mashinky.server.trains.offload import Busy, Offload, resolved
+
+
+def test_offload() -> None:
+    offload = Offload(workers=1, queue=1)
+    event = threading.Event()
+
+    running = offload.submit(event.wait)
+    waiting = offload.submit(lambda: 2)
+
+    with pytest.raises(Busy):
+        offload.submit(lambda: 3)
+
+    assert offload.stats() == {"workers": 1, "queue": 1, "pending": 2, "refused": 1}
+
+    event.set()
+    assert running.result() is True
+    assert waiting.result() == 2
+
+    offload.executor.shutdown(wait=True)
+    assert offload.stats()["pending"] == 0
+
+
+def test_resolved() -> None:
+    assert resolved(1).result() == 1
+
+
+def test_stream() -> None:
+    offload = Offload(workers=1, queue=0)
+
+    assert list(offload.stream(lambda: iter(range(100)), buffer=4)) == list(range(100))
+    assert offload.stats()["pending"] == 0
+
+
+def test_stream_error() -> None:
+    def fail():
+        yield 1
+        raise ValueError("failed")
+
+    stream = Offload(workers=1, queue=0).stream(fail)
+
+    assert next(stream) == 1
+    with pytest.raises(ValueError):
+        next(stream)
+
+
+def test_stream_close() -> None:
+    produced = []
+
+    def produce():
+        for i in range(1000):
+            produced.append(i)
+            yield i
+
+    stream = Offload(workers=1, queue=0).stream(produce, buffer=1)
+    assert next(stream) == 0
+    stream.close()
+
+    # The generator stops once the buffer is full and the stream is closed.
+    stream.future.result(timeout=5)
+    assert len(produced) < 1000
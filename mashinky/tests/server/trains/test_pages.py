@@ -0,0 +1,31 @@
+import pytest
+
+from mashinky.server.trains.pages import Page
+
+
+@pytest.mark.parametrize(
+    "number,expected,first,last",
+    [
+        (1, [1, 2, 3], 1, 3),
+        (3, [7], 7, 7),
+        (0, [1, 2, 3], 1, 3),
+        (9, [7], 7, 7),
+    ],
+)
+def test_paginate(number, expected, first, last) -> None:
+    page = Page.paginate([1, 2, 3, 4, 5, 6, 7], number=number, size=3)
+
+    assert list(page.items) == expected
+    assert page.pages == 3
+    assert (page.first, page.last) == (first, last)
+    assert page.has_previous == (page.number > 1)
+    assert page.has_next == (page.number < 3)
+
+
+def test_paginate_empty() -> None:
+    page = Page.paginate([], number=2, size=3)
+
+    assert page.number == 1
+    assert page.pages == 1
+    assert (page.first, page.last) == (0, 0)
+    assert not page.has_previous and not page.has_next
@@ -0,0 +1,30 @@
+import pathlib
+import pstats
+import time
+
+from mashinky.server.trains.profiling import profile_collapsed, profile_pstats
+
+
+def busy() -> int:
+    end = time.perf_counter() + 0.05
+    while time.perf_counter() < end:
+        pass
+    return 1
+
+
+def test_profile_pstats(tmp_path: pathlib.Path) -> None:
+    result, data = profile_pstats(busy)
+    (tmp_path / "busy.pstats").write_bytes(data)
+
+    assert result == 1
+    assert any(name == "busy" for _, _, name in pstats.Stats(str(tmp_path / "busy.pstats")).stats)
+
+
+def test_profile_collapsed() -> None:
+    result, data = profile_collapsed(busy)
+    lines = data.decode().splitlines()
+
+    assert result == 1
+    assert lines
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("busy (test_profiling.py:" in line for line in lines)
@@ -0,0 +1,17 @@
+import json
+
+from mashinky.server.trains.models import Train
+from mashinky.server.trains.serialise import serialise_train
+
+
+def test_serialise_train(catalog) -> None:
+    small, *_ = catalog.engines
+    coach, first, pwg, _ = catalog.wagons
+    train = Train(((small, 1), (coach, 3), (pwg, 1)))
+
+    data = json.loads(json.dumps(serialise_train(train)))
+
+    assert data["runs"] == [["Small", 1], ["COACH_CAR", 3], ["PWG_PR-14", 1]]
+    assert data["bonus_capacity"] == train.bonus_capacity
+    assert data["cargo"] == {"P": 69, "M": 9}
+    assert data["cost"] == {"F0000000": 100}
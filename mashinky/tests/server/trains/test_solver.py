@@ -0,0 +1,73 @@
+import itertools
+
+import pytest
+
+from mashinky.models import Epoch
+from mashinky.server.trains.generate import generate_trains
+from mashinky.server.trains.options import MaximumLength, MaximumWeight, Options, Strategy
+from mashinky.server.trains.solver import generate_solved_trains, generate_solved_vectors
+from mashinky.server.trains.vectors import Matrix
+
+
+@pytest.mark.parametrize("maximum_weight", list(MaximumWeight))
+@pytest.mark.parametrize("maximum_length", list(MaximumLength))
+@pytest.mark.parametrize("maximum_engines", [1, 2, 3])
+def test_solver(catalog, pipeline, maximum_weight, maximum_length, maximum_engines) -> None:
+    options = Options(
+        epoch=Epoch.EARLY_STEAM,
+        include_depo_upgrade=False,
+        include_quest_reward=False,
+        maximum_engines=maximum_engines,
+        maximum_weight=maximum_weight,
+        maximum_length=maximum_length,
+        strategy=Strategy.SOLVER,
+    )
+    candidates = list(
+        generate_trains(
+            selected_engines=catalog.engines,
+            selected_wagons=catalog.wagons,
+            suggestions=catalog.suggestions,
+            station_length_short=options.station_length_short,
+            station_length_long=options.station_length_long,
+            maximum_engines=options.maximum_engines,
+        )
+    )
+    solved = list(
+        generate_solved_trains(catalog.engines, catalog.wagons, catalog.suggestions, options)
+    )
+
+    # Every solved train is inside the limits, and there are fewer of them.
+    assert all(options.should_include(train) for train in solved)
+    assert len(solved) < len(candidates)
+
+    # The solver finds the best train the heuristics found, or a better one. With no limits at all
+    # there is no best train, and the solver stops at a long station.
+    if maximum_weight != MaximumWeight.INFINITE or maximum_length != MaximumLength.INFINITE:
+        expected = pipeline(candidates, options)
+        actual = pipeline(solved, options)
+        assert max(t.bonus_capacity for t in actual) >= max(t.bonus_capacity for t in expected)
+
+    matrix = Matrix.build(itertools.chain(catalog.engines, catalog.wagons))
+    vectors = generate_solved_vectors(
+        matrix, catalog.engines, catalog.wagons, catalog.suggestions, options
+    )
+    assert [matrix.train(v) for v in vectors] == solved
+
+
+def test_solver_fills_to_empty_weight(catalog) -> None:
+    options = Options(
+        epoch=Epoch.EARLY_STEAM,
+        include_depo_upgrade=False,
+        include_quest_reward=False,
+        maximum_engines=1,
+        maximum_weight=MaximumWeight.EMPTY,
+        maximum_length=MaximumLength.INFINITE,
+        strategy=Strategy.SOLVER,
+    )
+    small, flatbed = catalog.engines[0], catalog.wagons[3]
+
+    (train,) = generate_solved_trains([small], [flatbed], {}, options)
+
+    # The heuristics fill by full weight, which would stop at (315 - 30) // 20 = 14 wagons.
+    assert train.wagon_type_counter[flatbed] == (315 - 30) // 8
+    assert train.weight_empty <= train.recommended_weight
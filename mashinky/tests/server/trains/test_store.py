@@ -0,0 +1,53 @@
+from mashinky.models import Epoch
+from mashinky.server.trains.models import Train
+from mashinky.server.trains.options import Objective, Options
+from mashinky.server.trains.store import ResultStore, Stored
+
+
+def test_result_store(catalog, tmp_path) -> None:
+    store = ResultStore(tmp_path / "results.sqlite3")
+    small, large, *_ = catalog.engines
+    coach, *_ = catalog.wagons
+    trains = [Train(((small, 1), (coach, 3))), Train(((large, 2), (coach, 7)))]
+    counts = {"generate": 10, "frontier": 2}
+
+    assert store.get("a") is None
+    store.put("a", Stored.from_trains(trains, counts))
+
+    # A store opened by another worker reads the same entries.
+    stored = ResultStore(tmp_path / "results.sqlite3").get("a")
+    wagon_types = {wagon_type.id: wagon_type for wagon_type in (small, large, coach)}
+
+    assert stored.trains(wagon_types) == trains
+    assert stored.counts == counts
+
+
+def test_result_store_eviction(catalog, tmp_path) -> None:
+    store = ResultStore(tmp_path / "results.sqlite3", maxbytes=100)
+    stored = Stored.from_trains([Train(((catalog.engines[0], 1),))], {})
+    store.put("a", stored)
+    store.put("b", stored)
+    assert store.get("a") is not None
+
+    # Each entry is a little over 40 bytes, so adding a third evicts the least recently used.
+    store.put("c", stored)
+    assert store.get("a") is not None
+    assert store.get("b") is None
+    assert store.get("c") is not None
+
+
+def test_result_store_key() -> None:
+    def options(*objectives: Objective) -> Options:
+        return Options(
+            epoch=Epoch.STEAM,
+            include_depo_upgrade=False,
+            include_quest_reward=False,
+            objectives=objectives,
+        )
+
+    a = ResultStore.key("digest", options(Objective.COST, Objective.FUEL), ["B", "A"], [], [])
+    b = ResultStore.key("digest", options(Objective.FUEL, Objective.COST), ["A", "B", "A"], [], [])
+    c = ResultStore.key("other", options(Objective.FUEL, Objective.COST), ["A", "B"], [], [])
+
+    assert a == b
+    assert a != c
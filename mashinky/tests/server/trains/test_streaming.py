@@ -0,0 +1,50 @@
+import pytest
+
+from mashinky.server.trains.streaming import Deferred, buffered
+
+
+def test_deferred() -> None:
+    calls = []
+    deferred = Deferred(lambda: calls.append(1) or {"a": 1})
+
+    assert not deferred.resolved
+    assert deferred.get() == {"a": 1}
+    assert deferred.keys() == {"a": 1}.keys()
+    assert deferred.resolved
+    assert calls == [1]
+
+
+def test_deferred_iter() -> None:
+    deferred = Deferred(lambda: [1, 2, 3])
+
+    assert list(deferred) == [1, 2, 3]
+    assert deferred.resolved
+
+
+def test_buffered() -> None:
+    deferred = Deferred(lambda: "value")
+
+    def chunks():
+        yield "a"
+        yield "b"
+        deferred.get()
+        yield from "cdefg"
+
+    assert list(buffered(chunks(), deferred, size=2)) == ["a", "b", "cd", "ef", "g"]
+
+
+def test_deferred_error() -> None:
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise ValueError("failed")
+
+    deferred = Deferred(fail)
+
+    assert isinstance(deferred.error, ValueError)
+    assert deferred.resolved
+    with pytest.raises(ValueError):
+        deferred.get()
+    assert calls == [1]
+    assert Deferred(lambda: "value").error is None
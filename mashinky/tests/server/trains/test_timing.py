@@ -0,0 +1,59 @@
+from mashinky.server.trains.timing import Histogram, Metrics, Timings, timed, trailed
+
+
+def test_timings() -> None:
+    timings = Timings()
+
+    with timings.stage("generate"):
+        pass
+
+    timings.add("generate", 0.5)
+    timings.count("generate", 10)
+    timings.count("filter", 5)
+
+    assert timings.stages["generate"].seconds >= 0.5
+    assert timings.header().startswith("generate;dur=5")
+    assert timings.header().endswith(', filter;desc="5 items"')
+
+
+def test_timed() -> None:
+    timings = Timings()
+    assert list(timed(iter("abc"), timings, "render")) == ["a", "b", "c"]
+    assert timings.stages["render"].seconds is not None
+
+
+def test_histogram() -> None:
+    histogram = Histogram((1, 10))
+
+    for value in (0.5, 1, 5, 50):
+        histogram.observe(value)
+
+    assert histogram.stats() == {
+        "count": 4,
+        "sum": 56.5,
+        "buckets": {"1": 2, "10": 3, "+Inf": 4},
+    }
+
+
+def test_metrics() -> None:
+    timings = Timings()
+    timings.add("generate", 0.002)
+    timings.count("generate", 50)
+    timings.count("filter", 20)
+
+    metrics = Metrics()
+    metrics.observe("trains", timings)
+    metrics.observe("trains", timings)
+
+    stats = metrics.stats()["trains"]
+    assert stats["generate"]["seconds"]["count"] == 2
+    assert stats["generate"]["items"]["buckets"]["100"] == 2
+    assert "seconds" not in stats["filter"]
+
+
+def test_trailed() -> None:
+    timings = Timings()
+    chunks = list(trailed(timed(iter(["<html>", "</html>"]), timings, "render"), timings))
+
+    assert chunks[:2] == ["<html>", "</html>"]
+    assert chunks[2].strip().startswith("<!-- Server-Timing: render;dur=")
@@ -0,0 +1,39 @@
+import itertools
+
+import pytest
+
+from mashinky.models import Epoch
+from mashinky.server.trains.generate import generate_trains
+from mashinky.server.trains.options import MaximumLength, MaximumWeight, Options
+from mashinky.server.trains.vectors import Matrix, generate_vectors
+
+
+@pytest.mark.parametrize("maximum_weight", list(MaximumWeight))
+@pytest.mark.parametrize("maximum_length", list(MaximumLength))
+@pytest.mark.parametrize("maximum_engines", [1, 2, 3])
+def test_vectors_match_trains(
+    catalog, pipeline, maximum_weight, maximum_length, maximum_engines
+) -> None:
+    options = Options(
+        epoch=Epoch.EARLY_STEAM,
+        include_depo_upgrade=False,
+        include_quest_reward=False,
+        maximum_engines=maximum_engines,
+        maximum_weight=maximum_weight,
+        maximum_length=maximum_length,
+    )
+    kwargs = dict(
+        selected_engines=catalog.engines,
+        selected_wagons=catalog.wagons,
+        suggestions=catalog.suggestions,
+        station_length_short=options.station_length_short,
+        station_length_long=options.station_length_long,
+        maximum_engines=options.maximum_engines,
+    )
+    matrix = Matrix.build(itertools.chain(catalog.engines, catalog.wagons))
+
+    expected = pipeline(generate_trains(**kwargs), options)
+    actual = [matrix.train(v) for v in pipeline(generate_vectors(matrix, **kwargs), options)]
+
+    assert actual == expected
+    assert [t.bonus_capacity for t in actual] == [t.bonus_capacity for t in expected]
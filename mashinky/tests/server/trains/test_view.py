@@ -0,0 +1,168 @@
+from mashinky.models import Epoch
+from mashinky.server.trains.generate import Results, generate_ranked
+from mashinky.server.trains.models import Train
+from mashinky.server.trains.options import MaximumLength, Options
+from mashinky.server.trains.view import CargoAmount, Icon, Payment, RowBuilder, Selection
+
+OPTIONS = Options(
+    epoch=Epoch.EARLY_STEAM,
+    include_depo_upgrade=False,
+    include_quest_reward=False,
+    maximum_length=MaximumLength.SHORT,
+    station_length_short=12,
+    station_length_long=20,
+)
+
+
+def make_results(catalog, trains, **kwargs) -> Results:
+    """Results for these trains, with the whole catalog selected unless `kwargs` says otherwise."""
+    weight_usage = [t.weight_usage() for t in trains]
+    length_usage = [t.length_usage(OPTIONS.station_length) for t in trains]
+
+    fields = dict(
+        options=OPTIONS,
+        all_engines=catalog.engines,
+        all_wagons=catalog.wagons,
+        all_cargos=catalog.cargo_types,
+        selected_engines=catalog.engines,
+        selected_wagons=catalog.wagons,
+        selected_cargos=catalog.cargo_types,
+        filtered_wagons=catalog.wagons,
+        suggestions=catalog.suggestions,
+        trains=trains,
+        after_generate=len(trains),
+        after_deduplicate=len(trains),
+        after_filter=len(trains),
+        after_discard_empty=len(trains),
+        after_discard_extra=len(trains),
+        after_sort=len(trains),
+        after_frontier=len(trains),
+        best_capacity=max(t.capacity for t in trains),
+        best_bonus_capacity=max(t.bonus_capacity for t in trains),
+        best_max_speed=max(t.max_speed for t in trains),
+        best_weight_usage=max((u for u in weight_usage if u <= 1), default=None),
+        best_length_usage=max((u for u in length_usage if u <= 1), default=None),
+        any_train_has_bonus=any(t.has_bonus for t in trains),
+    )
+    fields.update(kwargs)
+    return Results(**fields)
+
+
+def test_row(catalog) -> None:
+    small, *_ = catalog.engines
+    coach, _, pwg, _ = catalog.wagons
+    train = Train(((small, 2), (coach, 3), (pwg, 1)))
+
+    row = RowBuilder(make_results(catalog, [train]), OPTIONS, tile_width=100).row(train)
+
+    assert row.icons[0] == Icon(
+        filename="images/wagon_type_icon/Small.png", name="Small", id="Small", width=100
+    )
+    assert [icon.id for icon in row.icons] == ["Small"] * 2 + ["COACH_CAR"] * 3 + ["PWG_PR-14"]
+    assert [icon.width for icon in row.icons] == [100, 100, 75, 75, 75, 50]
+    assert row.tiles_width == 12 * 100 + 1
+    assert not row.long
+    assert row.description == [(small, 2), (coach, 3), (pwg, 1)]
+
+    # Only passengers are shown with a bonus.
+    assert row.cargo == [
+        CargoAmount(
+            filename="p.png", label="Passengers", name="passengers", amount=60, bonus_amount=69
+        ),
+        CargoAmount(filename="m.png", label="Mail", name="mail", amount=8, bonus_amount=None),
+    ]
+    assert row.bonus_incomes == [pwg]
+
+    assert row.length == "4.75"
+    assert row.length_usage == "40%"
+    assert not row.over_length_short
+    assert row.weight_usage == "{:.0%}".format(train.weight_usage())
+
+    # The only train is the best at everything.
+    assert row.best_capacity and row.best_bonus_capacity and row.best_max_speed
+    assert row.best_weight_usage == (train.weight_usage() <= 1)
+    assert row.best_length_usage
+
+
+def test_row_long(catalog) -> None:
+    _, large, _ = catalog.engines
+    *_, flatbed = catalog.wagons
+    train = Train(((large, 1), (flatbed, 14)))
+
+    row = RowBuilder(make_results(catalog, [train]), OPTIONS, tile_width=10).row(train)
+
+    # Trains that don't fit in the station are drawn against the long station instead.
+    assert row.long
+    assert row.tiles_width == 20 * 10 + 1
+    assert row.over_length_short
+    assert not row.over_length_long
+    assert row.length == "15.50"
+
+
+def test_payments(catalog) -> None:
+    small, large, fast = catalog.engines
+    coach, *_ = catalog.wagons
+    builder = RowBuilder(make_results(catalog, [Train(((small, 1),))]), OPTIONS, tile_width=100)
+
+    row = builder.row(Train(((small, 1), (large, 2), (coach, 4))))
+
+    assert row.cost == [Payment(filename="money.png", label="Money", name="money", amount=700)]
+    assert row.fuel == [Payment(filename="coal.png", label="Coal", name="coal", amount=12)]
+    assert builder.row(Train(((fast, 1), (coach, 1)))).cost == []
+
+
+def test_rows(catalog) -> None:
+    trains, _ = generate_ranked(catalog.engines, catalog.wagons, catalog.suggestions, OPTIONS)
+    results = make_results(catalog, trains)
+
+    rows = RowBuilder(results, OPTIONS, tile_width=100).rows(trains)
+
+    assert len(rows) == len(trains)
+    assert [row.description for row in rows] == [
+        list(train.wagon_type_counter.items()) for train in trains
+    ]
+    assert [row.best_capacity for row in rows] == [
+        train.capacity == results.best_capacity for train in trains
+    ]
+    assert any(row.best_capacity for row in rows)
+    assert any(row.best_max_speed for row in rows)
+
+
+def test_rows_best_usage_none(catalog) -> None:
+    small, *_ = catalog.engines
+    *_, flatbed = catalog.wagons
+    train = Train(((small, 1), (flatbed, 20)))
+    results = make_results(catalog, [train])
+
+    # No train is inside the limits, so none of them is the best.
+    assert results.best_weight_usage is None
+    assert results.best_length_usage is None
+
+    (row,) = RowBuilder(results, OPTIONS, tile_width=100).rows([train])
+
+    assert not row.best_weight_usage
+    assert not row.best_length_usage
+
+
+def test_selection_from_results(catalog) -> None:
+    small, large, _ = catalog.engines
+    coach, *_ = catalog.wagons
+    passengers, *_ = catalog.cargo_types
+    results = make_results(
+        catalog,
+        [Train(((small, 1), (coach, 1)))],
+        selected_engines=[small, large],
+        selected_wagons=[coach],
+        selected_cargos=[passengers],
+    )
+
+    assert Selection.from_results(results) == Selection(
+        engine_ids=frozenset({"Small", "Large"}),
+        wagon_ids=frozenset({"COACH_CAR"}),
+        cargo_ids=frozenset({"P"}),
+    )
+
+    everything = Selection.from_results(make_results(catalog, [Train(((small, 1),))]))
+
+    assert everything.engine_ids == {"Small", "Large", "Fast"}
+    assert everything.cargo_ids == {"P", "M", "L"}